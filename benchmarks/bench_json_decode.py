@@ -0,0 +1,80 @@
+"""Micro-benchmark: decoding upstream API responses
+
+Compares the old path (``resp.text()`` then ``json.loads`` on the whole
+string) with utils.decoding (bytes straight into the parser, orjson when
+installed, URL fields only) on synthetic responses shaped like the real
+ones: a 50-image Wikimedia allimages page and a 10-image TheCatAPI search.
+
+Run from the repository root:
+
+    python benchmarks/bench_json_decode.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import decoding  # noqa: E402
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def wikimedia_page(count: int = 50) -> bytes:
+    images = [{
+        'name': f'Wolf_{i:04d}.jpg',
+        'timestamp': '2021-06-01T12:00:00Z',
+        'url': f'https://upload.wikimedia.org/wikipedia/commons/a/ab/Wolf_{i:04d}.{"svg" if i % 10 == 0 else "jpg"}',
+        'descriptionurl': f'https://commons.wikimedia.org/wiki/File:Wolf_{i:04d}.jpg',
+        'descriptionshorturl': f'https://commons.wikimedia.org/w/index.php?curid={1000000 + i}',
+        'ns': 6,
+        'title': f'File:Wolf {i:04d} in the snow, Yellowstone National Park.jpg',
+    } for i in range(count)]
+    data = {'batchcomplete': '', 'continue': {'aicontinue': 'Wolf_0050.jpg', 'continue': '-||'},
+            'query': {'allimages': images}}
+    return json.dumps(data).encode('utf-8')
+
+
+def search_page(count: int = 10) -> bytes:
+    data = [{'id': f'abc{i}', 'url': f'https://cdn2.thecatapi.com/images/abc{i}.jpg', 'width': 1200, 'height': 800,
+             'breeds': [], 'categories': [{'id': 5, 'name': 'boxes'}]} for i in range(count)]
+    return json.dumps(data).encode('utf-8')
+
+
+def old_wikimedia(raw: bytes):
+    data = json.loads(raw.decode('utf-8'))
+    token = data.get('continue', {}).get('aicontinue')
+    images = data.get('query', {}).get('allimages', [])
+    return [image['url'] for image in images if image.get('url', '').lower().endswith(EXTENSIONS)], token
+
+
+def old_search(raw: bytes):
+    data = json.loads(raw.decode('utf-8'))
+    return [item['url'] for item in data or [] if 'url' in item]
+
+
+def bench(label: str, func, raw: bytes, number: int) -> float:
+    best = min(timeit.repeat(lambda: func(raw), number=number, repeat=5))
+    per_call = best / number * 1e6
+    print(f'  {label:<28} {per_call:8.1f} us/call')
+    return per_call
+
+
+def main() -> None:
+    print(f'JSON backend: {decoding.JSON_BACKEND}')
+    cases = [
+        ('Wikimedia page (50 images)', wikimedia_page(), old_wikimedia,
+         lambda raw: decoding.wikimedia_page(raw, EXTENSIONS), 2000),
+        ('Cat search (10 images)', search_page(), old_search, decoding.search_urls, 10000),
+    ]
+    for name, raw, old, new, number in cases:
+        assert old(raw) == new(raw), f'{name}: decoders disagree'
+        print(f'{name}, {len(raw)} bytes:')
+        before = bench('text + json.loads', old, raw, number)
+        after = bench('utils.decoding', new, raw, number)
+        print(f'  speedup: {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
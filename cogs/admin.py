@@ -0,0 +1,77 @@
+import discord
+from discord.ext import commands
+import logging
+
+logger = logging.getLogger('AnimalVerse')
+
+class Admin(commands.Cog):
+    """Owner-only runtime tuning for AnimalVerse"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def _animals(self):
+        """The Animals cog, which owns the API handler"""
+        return self.bot.get_cog('Animals')
+
+    @commands.group(name='apiconfig', invoke_without_command=True)
+    @commands.is_owner()
+    async def apiconfig(self, ctx):
+        """Show the API settings, image pools and circuit breakers"""
+        animals = self._animals()
+        if animals is None:
+            await ctx.send("❌ Animals cog isn't loaded.")
+            return
+        handler = animals.api_handler
+        embed = discord.Embed(title="⚙️ API Configuration", color=discord.Color.blue())
+        settings = "\n".join(f"`{key}` = {value}" for key, value in animals.api_config.as_dict().items())
+        embed.add_field(name="Settings", value=settings, inline=False)
+        pools = handler.pool.stats()
+        embed.add_field(
+            name=f"Image Pools (max {handler.pool.max_size})",
+            value=", ".join(f"{animal}: {size}" for animal, size in sorted(pools.items())) or "Empty",
+            inline=False
+        )
+        circuits = handler.circuit_states()
+        embed.add_field(
+            name="Circuits",
+            value="\n".join(
+                f"`{host}` {state['state']}"
+                + (f" (retry in {state['retry_in']}s)" if state['retry_in'] else "")
+                + f", opened {state['times_opened']}x"
+                for host, state in sorted(circuits.items())
+            ) or "No requests yet",
+            inline=False
+        )
+        embed.set_footer(text="Change a setting with !apiconfig set <key> <value>")
+        await ctx.send(embed=embed)
+
+    @apiconfig.command(name='set')
+    @commands.is_owner()
+    async def apiconfig_set(self, ctx, key: str, value: str):
+        """Change an API setting without restarting the bot"""
+        animals = self._animals()
+        if animals is None:
+            await ctx.send("❌ Animals cog isn't loaded.")
+            return
+        try:
+            config = animals.api_config.replace(**{key: value})
+        except KeyError:
+            await ctx.send(f"❌ Unknown setting `{key}`. Settings: {', '.join(f'`{k}`' for k in animals.api_config.FIELDS)}")
+            return
+        except ValueError as e:
+            await ctx.send(f"❌ Invalid value for `{key}`: {str(e)[:100]}")
+            return
+        animals.api_handler.apply_config(config)
+        animals.api_config = config
+        self.bot.config[key] = getattr(config, key)
+        logger.info(f'API setting {key} changed to {getattr(config, key)} by {ctx.author}')
+        embed = discord.Embed(
+            title="✅ API Setting Updated",
+            description=f"`{key}` = {getattr(config, key)}",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -2,8 +2,7 @@ import discord
 from discord.ext import commands
 import random
 import logging
-from utils import APIHandler, UserStats
-from utils.database import JSONDatabase
+from utils import APIConfig, APIHandler
 
 logger = logging.getLogger('AnimalVerse')
 
@@ -12,9 +11,10 @@ class Animals(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.api_handler = APIHandler()
-        self.db = JSONDatabase()
-        self.user_stats = UserStats(self.db)
+        self.api_config = APIConfig.from_config(bot.config)
+        self.api_handler = APIHandler.from_config(self.api_config)
+        self.db = bot.db
+        self.user_stats = bot.user_stats
         self.request_count = {}  # Track requests per user
         
         # Animals that use static images (Unsplash fallbacks)
@@ -22,7 +22,7 @@ class Animals(commands.Cog):
         # Animals with API support
         self.api_animals = {'cat', 'dog', 'fox', 'duck'}
         # Animals using Wikimedia/Wildlife API
-        self.wildlife_animals = {'bear', 'deer', 'eagle', 'dolphin', 'wolf', 'raccoon', 'hedgehog'}
+        self.wildlife_animals = APIHandler.WILDLIFE_ANIMALS
         
         self.animal_facts = {
             'cat': [
@@ -198,8 +198,22 @@ class Animals(commands.Cog):
             ]
         }
 
+    def api_keys(self) -> dict:
+        """API keys for get_animal_image, from the bot config"""
+        return {
+            'cat': self.bot.config.get('cats_api_key', ''),
+            'dog': self.bot.config.get('dogs_api_key', ''),
+        }
+
     async def cog_load(self):
         """Initialize on cog load"""
+        if self.bot.config.get('image_cache_persist', True):
+            await self.api_handler.load_pool(self.db)
+        self.api_handler.start(
+            self.api_keys(),
+            low_water=self.api_config.image_pool_low_water,
+            persist_interval=self.bot.config.get('image_cache_save_interval', 300)
+        )
         logger.info('Animals cog loaded')
 
     async def cog_unload(self):
@@ -274,21 +288,7 @@ class Animals(commands.Cog):
                 await ctx_or_interaction.response.defer()
             
             # Get image based on animal type
-            image_url = None
-            if animal_name == 'cat':
-                image_url = await self.api_handler.get_cat_image(self.bot.config.get('cats_api_key', ''))
-            elif animal_name == 'dog':
-                image_url = await self.api_handler.get_dog_image(self.bot.config.get('dogs_api_key', ''))
-            elif animal_name == 'fox':
-                image_url = await self.api_handler.get_fox_image()
-            elif animal_name == 'duck':
-                image_url = await self.api_handler.get_duck_image()
-            elif animal_name in self.wildlife_animals:
-                # Use Wikimedia API for wildlife animals
-                image_url = await self.api_handler.get_wildlife_image(animal_name)
-            else:
-                # Use static images for remaining animals
-                image_url = self.api_handler.get_static_image(animal_name)
+            image_url = await self.api_handler.get_animal_image(animal_name, self.api_keys())
             
             # Fallback if image fetch failed
             if not image_url:
@@ -312,7 +312,7 @@ class Animals(commands.Cog):
             
             # Track stats
             try:
-                self.user_stats.add_favorite_animal(user_id, animal_name)
+                await self.user_stats.aadd_favorite_animal(user_id, animal_name)
             except Exception as e:
                 logger.debug(f"Error tracking stats: {e}")
         
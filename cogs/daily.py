@@ -1,125 +1,231 @@
 import discord
 from discord.ext import commands, tasks
+import asyncio
 import random
-from datetime import datetime
-from utils import JSONDatabase, GuildSettings
+import time
+from datetime import datetime, timedelta
+from utils import DailySchedule
+from utils.scheduler import next_occurrence
+
+# Animals picked from when a guild hasn't chosen any
+DEFAULT_ANIMALS = ['cat', 'dog', 'fox', 'duck', 'rabbit', 'raccoon', 'owl',
+                   'penguin', 'panda', 'koala', 'sloth', 'hedgehog', 'otter',
+                   'squirrel', 'deer', 'bear', 'wolf', 'eagle', 'dolphin']
 
 class DailyAnimal(commands.Cog):
     """Daily animal notifications for servers"""
 
     def __init__(self, bot):
         self.bot = bot
-        self.db = JSONDatabase()
-        self.guild_settings = GuildSettings(self.db)
+        self.db = bot.db
+        self.guild_settings = bot.guild_settings
+        self.schedule = DailySchedule()
+        self._send_semaphore = asyncio.Semaphore(max(1, bot.config.get('daily_max_concurrent_sends', 20)))
+        self._tasks = set()
+        # guild_id -> (animal, image_url, prepared_at) picked ahead of the guild's slot
+        self._prepared = {}
+        self._prewarmed_until = datetime.now().replace(second=0, microsecond=0)
         self.daily_loop.start()
 
+    async def cog_load(self):
+        """Index the guilds that have daily animals enabled"""
+        try:
+            self.schedule.clear()
+            async for guild_id, settings in self.db.aiter_items(self.guild_settings.collection):
+                self.schedule.update(guild_id, settings)
+            print(f"Daily animals scheduled for {len(self.schedule)} guild(s)")
+        except Exception as e:
+            print(f"Error building daily schedule: {e}")
+
+    async def _refresh_schedule(self, guild_id: int, reschedule: bool = False) -> None:
+        """Re-index a guild after its daily settings changed
+
+        With ``reschedule`` the stored next due time is moved to the next
+        occurrence of the guild's (new) daily time.
+        """
+        settings = await self.guild_settings.aget_settings(guild_id)
+        slot = DailySchedule.slot_for(settings)
+        if reschedule and slot is not None:
+            settings['daily_next_due'] = next_occurrence(slot, datetime.now()).isoformat(timespec='minutes')
+            await self.guild_settings.aset_setting(guild_id, 'daily_next_due', settings['daily_next_due'])
+        self.schedule.update(guild_id, settings)
+
     async def cog_unload(self):
         """Cleanup on cog unload"""
         self.daily_loop.cancel()
+        for task in self._tasks:
+            task.cancel()
+
+    def _spawn(self, coro) -> None:
+        """Run a coroutine in the background, tracked for cancellation on unload"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
     @tasks.loop(minutes=1)
     async def daily_loop(self):
-        """Main loop for daily animals - checks every minute"""
+        """Main loop for daily animals - sends everything that has come due"""
         try:
             now = datetime.now()
+            grace = timedelta(minutes=self.bot.config.get('daily_catchup_minutes', 60))
+            self._schedule_prewarm(now)
+            
+            due = []
+            for guild_id, due_at in self.schedule.pop_due(now):
+                if now - due_at > grace:
+                    print(f"Skipping daily animal for guild {guild_id}: due {due_at:%Y-%m-%d %H:%M}, too late to catch up")
+                    continue
+                guild = self.bot.get_guild(guild_id)
+                if guild:
+                    due.append((guild, due_at))
+            if not due:
+                return
             
-            for guild in self.bot.guilds:
+            # Deliver in the background so a big slot can't hold up the next tick
+            self._spawn(self._deliver(due, now))
+        except Exception as e:
+            print(f"Error in daily loop: {e}")
+
+    def _schedule_prewarm(self, now: datetime) -> None:
+        """Start prewarming every slot up to DAILY_PREWARM_MINUTES ahead that isn't yet"""
+        lead = self.bot.config.get('daily_prewarm_minutes', 3)
+        if lead <= 0:
+            return
+        horizon = now.replace(second=0, microsecond=0) + timedelta(minutes=lead)
+        guild_ids = set()
+        slot_time = max(self._prewarmed_until, now.replace(second=0, microsecond=0))
+        while slot_time < horizon:
+            slot_time += timedelta(minutes=1)
+            guild_ids |= self.schedule.due(slot_time.hour, slot_time.minute)
+        self._prewarmed_until = max(self._prewarmed_until, horizon)
+        
+        # Forget picks whose slot has long passed (guild disabled, channel gone, ...)
+        stale = now - timedelta(minutes=lead + 30)
+        for guild_id in [g for g, (_, _, prepared_at) in self._prepared.items() if prepared_at < stale]:
+            del self._prepared[guild_id]
+        
+        if guild_ids:
+            self._spawn(self._prewarm(guild_ids))
+
+    async def _prewarm(self, guild_ids: set) -> None:
+        """Pick each guild's animal and fetch distinct images for them ahead of the slot"""
+        try:
+            animal_cog = self.bot.get_cog('Animals')
+            if not animal_cog:
+                return
+            api_handler = animal_cog.api_handler
+            api_keys = animal_cog.api_keys()
+            
+            settings = await self.db.aget_many(self.guild_settings.collection, [str(g) for g in guild_ids])
+            picks = {}
+            for guild_id, guild_settings in settings.items():
+                picks.setdefault(self._pick_animal(guild_settings), []).append(int(guild_id))
+            
+            # One batch of fetches per animal, all animals in parallel
+            animals = list(picks)
+            batches = await asyncio.gather(
+                *(api_handler.prefetch_images(animal, len(picks[animal]), api_keys) for animal in animals)
+            )
+            prepared_at = datetime.now()
+            for animal, urls in zip(animals, batches):
+                for i, guild_id in enumerate(picks[animal]):
+                    # Out of fetched images: a static one still keeps delivery off the APIs
+                    image_url = urls[i] if i < len(urls) else api_handler.get_static_image(animal)
+                    self._prepared[guild_id] = (animal, image_url, prepared_at)
+        except Exception as e:
+            print(f"Error prewarming daily animals: {e}")
+
+    @staticmethod
+    def _pick_animal(settings: dict) -> str:
+        """Pick today's animal from a guild's selection"""
+        return random.choice(settings.get('animal_types') or DEFAULT_ANIMALS)
+
+    async def _deliver(self, due: list, now: datetime) -> None:
+        """Send the due dailies concurrently and report delivery latency"""
+        started = time.monotonic()
+        latencies = []
+
+        async def deliver(guild: discord.Guild, due_at: datetime) -> None:
+            # discord.py waits out per-route and global rate limits inside send()
+            async with self._send_semaphore:
                 try:
-                    await self._check_and_send_daily(guild, now)
+                    if await self._check_and_send_daily(guild, due_at):
+                        latencies.append(time.monotonic() - started)
                 except Exception as e:
                     print(f"Error in daily animal for guild {guild.id}: {e}")
-        except Exception as e:
-            print(f"Error in daily loop: {e}")
+
+        await asyncio.gather(*(deliver(guild, due_at) for guild, due_at in due))
+        
+        if latencies:
+            latencies.sort()
+            print(f"Daily animals {now:%H:%M}: sent {len(latencies)}/{len(due)} in "
+                  f"{time.monotonic() - started:.2f}s (median {latencies[len(latencies) // 2]:.2f}s, "
+                  f"slowest {latencies[-1]:.2f}s)")
 
     @daily_loop.before_loop
     async def before_daily_loop(self):
         """Wait for bot to be ready before starting loop"""
         await self.bot.wait_until_ready()
 
-    async def _check_and_send_daily(self, guild: discord.Guild, now: datetime) -> None:
-        """Check if daily animal should be sent for this guild"""
+    async def _check_and_send_daily(self, guild: discord.Guild, due_at: datetime) -> bool:
+        """Send the daily animal due at ``due_at`` unless it was already sent, returns True if sent"""
         try:
-            self.guild_settings.initialize_guild(guild.id)
-            settings = self.guild_settings.get_settings(guild.id)
+            settings = await self.guild_settings.aget_settings(guild.id)
             
             # Check if daily animal is enabled
             if not settings.get('daily_animal_enabled', False):
-                return
+                return False
             
             # Get channel
             channel_id = settings.get('daily_animal_channel')
             if not channel_id:
-                return
+                return False
             
             channel = guild.get_channel(int(channel_id))
             if not channel or not isinstance(channel, discord.TextChannel):
-                return
-            
-            # Check if it's time to send
-            target_hour = settings.get('daily_animal_hour', 8)
-            target_minute = settings.get('daily_animal_minute', 0)
-            
-            # Check if current time matches target time
-            if now.hour != target_hour or now.minute != target_minute:
-                return
+                return False
             
-            # Check if already sent today
-            last_sent = settings.get('last_daily_animal')
-            today = now.strftime('%Y-%m-%d')
-            
-            if last_sent == today:
-                return  # Already sent today
+            # Claim the day before sending: a concurrent tick or a catch-up after a
+            # restart finds it taken, so a guild gets at most one daily per day
+            slot = DailySchedule.slot_for(settings)
+            next_due = next_occurrence(slot, due_at).isoformat(timespec='minutes')
+            if not await self.guild_settings.aclaim_daily(guild.id, due_at.strftime('%Y-%m-%d'), next_due):
+                return False  # Already sent that day
             
             # Send daily animal
-            await self._send_daily_animal(channel, guild.id, settings)
-            
-            # Update last sent time
-            self.guild_settings.set_setting(guild.id, 'last_daily_animal', today)
+            return await self._send_daily_animal(channel, guild.id, settings)
         except Exception as e:
             print(f"Error in _check_and_send_daily: {e}")
+            return False
 
-    async def _send_daily_animal(self, channel: discord.TextChannel, guild_id: int, settings: dict) -> None:
-        """Send daily animal to channel"""
+    async def _send_daily_animal(self, channel: discord.TextChannel, guild_id: int, settings: dict,
+                                 use_prepared: bool = True) -> bool:
+        """Send daily animal to channel, returns True on success"""
         try:
             # Check bot permissions
             if not channel.permissions_for(channel.guild.me).send_messages:
                 print(f"Bot doesn't have send_messages permission in {channel.id}")
-                return
-            
-            # Get available animals
-            animal_types = settings.get('animal_types', [])
-            if not animal_types:
-                animal_types = ['cat', 'dog', 'fox', 'duck', 'rabbit', 'raccoon', 'owl', 
-                               'penguin', 'panda', 'koala', 'sloth', 'hedgehog', 'otter', 
-                               'squirrel', 'deer', 'bear', 'wolf', 'eagle', 'dolphin']
-            
-            animal_name = random.choice(animal_types)
+                return False
             
             # Get animal cog for fetching image
             animal_cog = self.bot.get_cog('Animals')
             if not animal_cog:
                 print("Animals cog not loaded")
-                return
+                return False
             
             # Get API handler
-            from utils import APIHandler
             api_handler = getattr(animal_cog, 'api_handler', None)
             if not api_handler:
                 print("API handler not found in Animals cog")
-                return
+                return False
             
-            # Fetch image
-            image_url = None
-            if animal_name == 'cat':
-                image_url = await api_handler.get_cat_image()
-            elif animal_name == 'dog':
-                image_url = await api_handler.get_dog_image()
-            elif animal_name == 'fox':
-                image_url = await api_handler.get_fox_image()
-            elif animal_name == 'duck':
-                image_url = await api_handler.get_duck_image()
+            # Use the animal and image prewarmed for this slot, or fetch one now
+            prepared = self._prepared.pop(guild_id, None) if use_prepared else None
+            if prepared:
+                animal_name, image_url, _ = prepared
             else:
-                image_url = api_handler.get_static_image(animal_name)
+                animal_name = self._pick_animal(settings)
+                image_url = await api_handler.get_animal_image(animal_name, animal_cog.api_keys())
             
             if not image_url:
                 image_url = api_handler.get_static_image(animal_name)
@@ -140,6 +246,7 @@ class DailyAnimal(commands.Cog):
             embed.set_footer(text="AnimalVerse 🐾 Daily")
             
             await channel.send(embed=embed)
+            return True
             
         except discord.errors.Forbidden:
             print(f"No permission to send message in {channel.id}")
@@ -147,14 +254,15 @@ class DailyAnimal(commands.Cog):
             print(f"Discord HTTP error in daily send: {e}")
         except Exception as e:
             print(f"Error sending daily animal: {e}")
+        return False
 
     @commands.group(name='daily', invoke_without_command=True)
     @commands.has_permissions(administrator=True)
     async def daily_group(self, ctx):
         """Daily animal configuration commands"""
         try:
-            self.guild_settings.initialize_guild(ctx.guild.id)
-            settings = self.guild_settings.get_settings(ctx.guild.id)
+            await self.guild_settings.ainitialize_guild(ctx.guild.id)
+            settings = await self.guild_settings.aget_settings(ctx.guild.id)
             
             embed = discord.Embed(
                 title="🐾 Daily Animal Settings",
@@ -213,9 +321,9 @@ class DailyAnimal(commands.Cog):
     async def daily_enable(self, ctx):
         """Enable daily animals"""
         try:
-            self.guild_settings.initialize_guild(ctx.guild.id)
+            await self.guild_settings.ainitialize_guild(ctx.guild.id)
             
-            if self.guild_settings.get_setting(ctx.guild.id, 'daily_animal_channel') is None:
+            if await self.guild_settings.aget_setting(ctx.guild.id, 'daily_animal_channel') is None:
                 embed = discord.Embed(
                     title="⚠️ Setup Required",
                     description="Please set a channel first using `!daily channel #channel`",
@@ -224,7 +332,8 @@ class DailyAnimal(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_enabled', True)
+            await self.guild_settings.aset_setting(ctx.guild.id, 'daily_animal_enabled', True)
+            await self._refresh_schedule(ctx.guild.id, reschedule=True)
             
             embed = discord.Embed(
                 title="✅ Daily Animals Enabled",
@@ -241,7 +350,8 @@ class DailyAnimal(commands.Cog):
     async def daily_disable(self, ctx):
         """Disable daily animals"""
         try:
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_enabled', False)
+            await self.guild_settings.aset_setting(ctx.guild.id, 'daily_animal_enabled', False)
+            self.schedule.remove(ctx.guild.id)
             
             embed = discord.Embed(
                 title="❌ Daily Animals Disabled",
@@ -268,8 +378,9 @@ class DailyAnimal(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             
-            self.guild_settings.initialize_guild(ctx.guild.id)
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_channel', channel.id)
+            await self.guild_settings.ainitialize_guild(ctx.guild.id)
+            await self.guild_settings.aset_setting(ctx.guild.id, 'daily_animal_channel', channel.id)
+            await self._refresh_schedule(ctx.guild.id)
             
             embed = discord.Embed(
                 title="📱 Channel Set",
@@ -296,9 +407,12 @@ class DailyAnimal(commands.Cog):
             if not (0 <= hour <= 23 and 0 <= minute <= 59):
                 raise ValueError("Invalid time")
             
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_hour', hour)
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_minute', minute)
-            self.guild_settings.set_setting(ctx.guild.id, 'daily_animal_time', time_str)
+            await self.guild_settings.aupdate_settings(ctx.guild.id, {
+                'daily_animal_hour': hour,
+                'daily_animal_minute': minute,
+                'daily_animal_time': time_str,
+            })
+            await self._refresh_schedule(ctx.guild.id, reschedule=True)
             
             embed = discord.Embed(
                 title="⏰ Time Set",
@@ -327,7 +441,7 @@ class DailyAnimal(commands.Cog):
     async def animals_list(self, ctx):
         """List currently selected animals for daily messages"""
         try:
-            animals = self.guild_settings.get_setting(ctx.guild.id, 'animal_types', [])
+            animals = await self.guild_settings.aget_setting(ctx.guild.id, 'animal_types', [])
             
             if not animals:
                 embed = discord.Embed(
@@ -363,7 +477,7 @@ class DailyAnimal(commands.Cog):
                 return
             
             animal_list = list(animals)
-            self.guild_settings.set_setting(ctx.guild.id, 'animal_types', animal_list)
+            await self.guild_settings.aset_setting(ctx.guild.id, 'animal_types', animal_list)
             
             embed = discord.Embed(
                 title="✅ Animals Set",
@@ -379,7 +493,7 @@ class DailyAnimal(commands.Cog):
     async def animals_clear(self, ctx):
         """Clear animal selection (use all animals)"""
         try:
-            self.guild_settings.set_setting(ctx.guild.id, 'animal_types', [])
+            await self.guild_settings.aset_setting(ctx.guild.id, 'animal_types', [])
             
             embed = discord.Embed(
                 title="✅ Animals Cleared",
@@ -396,8 +510,8 @@ class DailyAnimal(commands.Cog):
     async def daily_test(self, ctx):
         """Send a test daily animal message now"""
         try:
-            self.guild_settings.initialize_guild(ctx.guild.id)
-            settings = self.guild_settings.get_settings(ctx.guild.id)
+            await self.guild_settings.ainitialize_guild(ctx.guild.id)
+            settings = await self.guild_settings.aget_settings(ctx.guild.id)
             
             channel_id = settings.get('daily_animal_channel')
             if not channel_id:
@@ -429,7 +543,7 @@ class DailyAnimal(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             
-            await self._send_daily_animal(channel, ctx.guild.id, settings)
+            await self._send_daily_animal(channel, ctx.guild.id, settings, use_prepared=False)
             
             embed = discord.Embed(
                 title="✅ Test Sent",
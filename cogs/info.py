@@ -1,16 +1,15 @@
 import discord
 from discord.ext import commands
 from datetime import datetime
-from utils import JSONDatabase, UserStats, GuildSettings
 
 class Info(commands.Cog):
     """Information and help commands for AnimalVerse"""
 
     def __init__(self, bot):
         self.bot = bot
-        self.db = JSONDatabase()
-        self.user_stats = UserStats(self.db)
-        self.guild_settings = GuildSettings(self.db)
+        self.db = bot.db
+        self.user_stats = bot.user_stats
+        self.guild_settings = bot.guild_settings
 
     def create_help_embed(self):
         """Create a comprehensive help embed"""
@@ -138,10 +137,10 @@ class Info(commands.Cog):
     @commands.command(name='stats')
     async def prefix_stats(self, ctx):
         """Show user statistics (prefix command)"""
-        stats = self.user_stats.get_stats(ctx.author.id)
+        stats = await self.user_stats.aget_stats(ctx.author.id)
         commands_used = stats.get('commands', {})
         total_commands = sum(commands_used.values())
-        favorite_animal = self.user_stats.get_favorite_animal(ctx.author.id)
+        favorite_animal = await self.user_stats.aget_favorite_animal(ctx.author.id)
         
         embed = discord.Embed(
             title="📊 Your Statistics",
@@ -162,10 +161,10 @@ class Info(commands.Cog):
     @discord.app_commands.command(name='stats', description='View your statistics')
     async def slash_stats(self, interaction: discord.Interaction):
         """Show user statistics (slash command)"""
-        stats = self.user_stats.get_stats(interaction.user.id)
+        stats = await self.user_stats.aget_stats(interaction.user.id)
         commands_used = stats.get('commands', {})
         total_commands = sum(commands_used.values())
-        favorite_animal = self.user_stats.get_favorite_animal(interaction.user.id)
+        favorite_animal = await self.user_stats.aget_favorite_animal(interaction.user.id)
         
         embed = discord.Embed(
             title="📊 Your Statistics",
@@ -186,7 +185,7 @@ class Info(commands.Cog):
     @commands.command(name='serverinfo')
     async def prefix_serverinfo(self, ctx):
         """Show server information (prefix command)"""
-        settings = self.guild_settings.get_settings(ctx.guild.id)
+        settings = await self.guild_settings.aget_settings(ctx.guild.id)
         
         embed = discord.Embed(
             title=f"🏛️ {ctx.guild.name} Info",
@@ -207,7 +206,7 @@ class Info(commands.Cog):
     @discord.app_commands.command(name='serverinfo', description='Show server information')
     async def slash_serverinfo(self, interaction: discord.Interaction):
         """Show server information (slash command)"""
-        settings = self.guild_settings.get_settings(interaction.guild.id)
+        settings = await self.guild_settings.aget_settings(interaction.guild.id)
         
         embed = discord.Embed(
             title=f"🏛️ {interaction.guild.name} Info",
@@ -3,7 +3,7 @@ import discord
 from discord.ext import commands
 import asyncio
 import logging
-from utils import JSONDatabase, GuildSettings
+from utils import JSONDatabase, SQLiteDatabase, GuildSettings, UserStats, StatsEventLog
 import sys
 
 # ==================== CONFIGURATION ====================
@@ -40,8 +40,22 @@ FEATURE_STATS_ENABLED = True        # User statistics tracking
 FEATURE_SLASH_COMMANDS = True       # Slash commands (/)
 FEATURE_DM_SUPPORT = True           # Allow commands in DMs
 
+# ==================== DAILY ANIMALS ====================
+DAILY_MAX_CONCURRENT_SENDS = 20     # Daily messages delivered in parallel (Discord rate limits still apply)
+DAILY_CATCHUP_MINUTES = 60          # Still send a daily missed by downtime if it is at most this late
+DAILY_PREWARM_MINUTES = 3           # Fetch images this many minutes before a slot (0 = fetch while sending)
+
 # ==================== DATABASE ====================
 DATABASE_DIR = "data"               # Where to save JSON files
+DATABASE_BACKEND = "json"           # "json" (one file per collection) or "sqlite" (indexed, for large bots)
+DATABASE_FORMAT = "json-pretty"     # File format: "json-pretty", "json" (compact), "msgpack" or "marshal"
+DATABASE_SHARDS = {}                # Split big collections into N files by key hash (json backend), e.g. {'user_stats': 16}
+DATABASE_WRITE_BACK = True          # Keep collections in memory, flush to disk periodically
+DATABASE_FLUSH_INTERVAL = 30        # Seconds between write-back flushes (a journal covers the gap)
+STATS_EVENT_LOG = True              # Record stats as append-only events (data/stats_events/)
+STATS_COMPACT_INTERVAL = 60         # Seconds between folding events into user_stats (event log on)
+STATS_BATCH_WINDOW_MS = 500         # Coalesce stat bumps for this long before writing (event log off)
+STATS_BATCH_MAX_EVENTS = 200        # ...or write as soon as this many are pending
 
 # ==================== LOGGING ====================
 LOG_LEVEL = "INFO"                  # DEBUG, INFO, WARNING, ERROR, CRITICAL
@@ -55,8 +69,16 @@ DOGS_API_KEY = ""                   # From thedogapi.com
 # ==================== PERFORMANCE ====================
 API_TIMEOUT = 5                     # API timeout in seconds
 API_CALL_DELAY = 0.1                # Delay between API calls
-CACHE_TIMEOUT = 3600                # Cache duration in seconds
-MAX_CONCURRENT_REQUESTS = 5         # Max parallel API requests
+CACHE_TIMEOUT = 3600                # Seconds a fetched image may be reused from the pool
+IMAGE_POOL_SIZE = 50                # Recent image URLs kept per animal (served at random)
+IMAGE_POOL_LOW_WATER = 10           # Background workers refill a pool once it drops below this
+IMAGE_CACHE_PERSIST = True          # Save image pools to the database so restarts start warm
+IMAGE_CACHE_SAVE_INTERVAL = 300     # Seconds between image pool saves (also saved on shutdown)
+CIRCUIT_BREAKER_THRESHOLD = 5       # Failed requests in a row before an API is skipped (fallbacks served)
+CIRCUIT_BREAKER_RESET = 30          # Seconds before a skipped API is tried again
+API_RETRY_COUNT = 3                 # Attempts per image fetch
+API_RETRY_BUDGET = 8                # Most seconds one image fetch may take, retries included
+MAX_CONCURRENT_REQUESTS = 5         # Max parallel requests to each image API
 
 # ==================== BOT OWNER ====================
 BOT_OWNER_ID = None                 # Your Discord user ID (no quotes needed) - Example: 123456789
@@ -114,7 +136,7 @@ logger.info(f"  Statistics: {'✅' if FEATURE_STATS_ENABLED else '❌'}")
 logger.info(f"  Slash Commands: {'✅' if FEATURE_SLASH_COMMANDS else '❌'}")
 logger.info(f"  DM Support: {'✅' if FEATURE_DM_SUPPORT else '❌'}")
 logger.info(f"  API Keys: Cat={'✅' if CATS_API_KEY else '❌'} Dog={'✅' if DOGS_API_KEY else '❌'}")
-logger.info(f"  Database: {DATABASE_DIR}")
+logger.info(f"  Database: {DATABASE_DIR} ({DATABASE_BACKEND})")
 logger.info(f"  Log Level: {LOG_LEVEL}")
 logger.info("="*50 + "\n")
 
@@ -127,7 +149,7 @@ intents.guild_messages = True
 intents.dm_messages = True  # Enable DMs
 
 # Remove default help command to allow custom one
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None, owner_id=BOT_OWNER_ID)
 
 # Store configuration in bot for cogs to access
 bot.config = {
@@ -136,25 +158,72 @@ bot.config = {
     'cats_api_key': CATS_API_KEY,
     'dogs_api_key': DOGS_API_KEY,
     'api_timeout': API_TIMEOUT,
+    'max_concurrent_requests': MAX_CONCURRENT_REQUESTS,
     'database_dir': DATABASE_DIR,
+    'database_backend': DATABASE_BACKEND,
+    'database_format': DATABASE_FORMAT,
+    'database_shards': DATABASE_SHARDS,
+    'database_write_back': DATABASE_WRITE_BACK,
+    'database_flush_interval': DATABASE_FLUSH_INTERVAL,
+    'stats_event_log': STATS_EVENT_LOG,
+    'stats_compact_interval': STATS_COMPACT_INTERVAL,
+    'stats_batch_window_ms': STATS_BATCH_WINDOW_MS,
+    'stats_batch_max_events': STATS_BATCH_MAX_EVENTS,
     'feature_daily': FEATURE_DAILY_ENABLED,
     'feature_stats': FEATURE_STATS_ENABLED,
     'feature_slash': FEATURE_SLASH_COMMANDS,
     'feature_dm': FEATURE_DM_SUPPORT,
+    'daily_max_concurrent_sends': DAILY_MAX_CONCURRENT_SENDS,
+    'daily_catchup_minutes': DAILY_CATCHUP_MINUTES,
+    'daily_prewarm_minutes': DAILY_PREWARM_MINUTES,
     'cache_timeout': CACHE_TIMEOUT,
+    'image_pool_size': IMAGE_POOL_SIZE,
+    'image_pool_low_water': IMAGE_POOL_LOW_WATER,
+    'image_cache_persist': IMAGE_CACHE_PERSIST,
+    'image_cache_save_interval': IMAGE_CACHE_SAVE_INTERVAL,
+    'circuit_breaker_threshold': CIRCUIT_BREAKER_THRESHOLD,
+    'circuit_breaker_reset': CIRCUIT_BREAKER_RESET,
+    'api_retry_count': API_RETRY_COUNT,
+    'api_retry_budget': API_RETRY_BUDGET,
     'bot_owner_id': BOT_OWNER_ID,
 }
 
 # Initialize database with error handling
 try:
-    db = JSONDatabase(db_dir=DATABASE_DIR)
+    if DATABASE_BACKEND == 'sqlite':
+        db = SQLiteDatabase(db_dir=DATABASE_DIR)
+        imported = db.import_json()
+        for collection, count in imported.items():
+            logger.info(f'📥 Imported {count} record(s) from {collection}.json into SQLite')
+    else:
+        db = JSONDatabase(
+            db_dir=DATABASE_DIR,
+            write_back=DATABASE_WRITE_BACK,
+            flush_interval=DATABASE_FLUSH_INTERVAL,
+            serializer=DATABASE_FORMAT,
+            shards=DATABASE_SHARDS
+        )
+        for collection in db.convert_all():
+            logger.info(f'🔁 Converted {collection} to {DATABASE_FORMAT}')
     guild_settings = GuildSettings(db)
-    logger.info(f'💾 Database initialized at {DATABASE_DIR}')
+    user_stats = UserStats(
+        db,
+        event_log=StatsEventLog(DATABASE_DIR) if STATS_EVENT_LOG else None,
+        compact_interval=STATS_COMPACT_INTERVAL,
+        batch_window=STATS_BATCH_WINDOW_MS / 1000,
+        batch_max_events=STATS_BATCH_MAX_EVENTS
+    )
+    logger.info(f'💾 Database initialized at {DATABASE_DIR} ({DATABASE_BACKEND}{", write-back" if DATABASE_WRITE_BACK and DATABASE_BACKEND != "sqlite" else ""})')
 except Exception as e:
     logger.error(f'❌ Failed to initialize database: {e}')
     logger.error('Bot cannot start without database')
     sys.exit(1)
 
+# Share one storage object (and its cache/write buffer) with every cog
+bot.db = db
+bot.guild_settings = guild_settings
+bot.user_stats = user_stats
+
 @bot.event
 async def on_ready():
     """Bot startup event"""
@@ -201,7 +270,7 @@ async def on_guild_join(guild):
     """Bot joined new guild"""
     try:
         logger.info(f'📝 New guild: {guild.name} ({guild.id}) with {guild.member_count} members')
-        guild_settings.initialize_guild(guild.id)
+        await guild_settings.ainitialize_guild(guild.id)
     except Exception as e:
         logger.error(f'Error in on_guild_join: {e}')
 
@@ -244,6 +313,8 @@ async def on_command_error(ctx, error):
             if not is_dm:
                 perms = ', '.join(error.missing_perms)
                 await ctx.send(f"❌ I don't have permission: {perms}")
+        elif isinstance(error, commands.NotOwner):
+            await ctx.send("❌ Only the bot owner can use this command.")
         elif isinstance(error, commands.NoPrivateMessage):
             await ctx.send("❌ This command only works in servers.")
         elif isinstance(error, commands.CommandOnCooldown):
@@ -315,6 +386,12 @@ async def main():
         except Exception as e:
             logger.error(f'\n❌ Fatal error: {e}\n')
             sys.exit(1)
+        finally:
+            # Unload cogs while the database is still open so they can save their state
+            await bot.close()
+            # Apply pending stats and flush buffered database writes before exiting
+            user_stats.close()
+            db.close()
 
 if __name__ == '__main__':
     try:
@@ -1,5 +1,11 @@
 """AnimalVerse utilities package"""
-from .database import JSONDatabase, GuildSettings, UserStats
+from .database import JSONDatabase, SQLiteDatabase, GuildSettings, UserStats
+from .aggregator import CounterAggregator
+from .stats_log import StatsEventLog
+from .image_pool import ImagePool
+from .circuit_breaker import CircuitBreaker
+from .config import APIConfig
+from .scheduler import DailySchedule
 from .api_handler import APIHandler
 
-__all__ = ['JSONDatabase', 'GuildSettings', 'UserStats', 'APIHandler']
+__all__ = ['JSONDatabase', 'SQLiteDatabase', 'GuildSettings', 'UserStats', 'StatsEventLog', 'CounterAggregator', 'DailySchedule', 'ImagePool', 'CircuitBreaker', 'APIConfig', 'APIHandler']
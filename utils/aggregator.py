@@ -0,0 +1,46 @@
+from typing import Any, Dict
+
+# {key: {field: {name: count}}}
+CounterDeltas = Dict[str, Dict[str, Dict[str, int]]]
+
+
+class CounterAggregator:
+    """Coalesces counter increments per (key, field, name) until drained
+
+    Not thread-safe on its own; the owner serializes access (see UserStats).
+    """
+
+    def __init__(self, max_events: int = 0):
+        self.max_events = max_events
+        self._deltas: CounterDeltas = {}
+        self._events = 0
+
+    def __len__(self) -> int:
+        """Number of increments waiting to be applied"""
+        return self._events
+
+    def add(self, key: str, field: str, name: str, amount: int = 1) -> bool:
+        """Record an increment, returns True once ``max_events`` are pending"""
+        counts = self._deltas.setdefault(str(key), {}).setdefault(field, {})
+        counts[name] = counts.get(name, 0) + amount
+        self._events += 1
+        return bool(self.max_events) and self._events >= self.max_events
+
+    def pending(self, key: str) -> Dict[str, Dict[str, int]]:
+        """Deltas not yet applied for a single key"""
+        return self._deltas.get(str(key), {})
+
+    def drain(self) -> CounterDeltas:
+        """Take all pending deltas and reset"""
+        deltas, self._deltas = self._deltas, {}
+        self._events = 0
+        return deltas
+
+    @staticmethod
+    def merge(document: Dict[str, Any], deltas: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        """Add one key's deltas to its stored document"""
+        for field, counts in deltas.items():
+            target = document.setdefault(field, {})
+            for name, amount in counts.items():
+                target[name] = target.get(name, 0) + amount
+        return document
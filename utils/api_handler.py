@@ -1,15 +1,60 @@
 import aiohttp
 import random
 import asyncio
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+import time
+from typing import Any, Awaitable, Callable, Optional, Dict, List
+from urllib.parse import urlencode, urlparse
 import logging
+from . import decoding
+from .circuit_breaker import CircuitBreaker
+from .config import APIConfig
+from .image_pool import ImagePool
+from .retry import RateLimits, RetryPolicy
 
 logger = logging.getLogger('AnimalVerse')
 
 class APIHandler:
     """Robust API handler with retries, caching, rate limiting, and fallbacks"""
 
+    # Animals served from the Wikimedia API
+    WILDLIFE_ANIMALS = {'bear', 'deer', 'eagle', 'dolphin', 'wolf', 'raccoon', 'hedgehog'}
+    # Endpoints that return several images per request with ?limit=N (API key required)
+    SEARCH_APIS = {
+        'cat': 'https://api.thecatapi.com/v1/images/search',
+        'dog': 'https://api.thedogapi.com/v1/images/search',
+    }
+    SEARCH_PAGE_SIZE = 100  # Most images a search API returns per request
+    # Wikimedia Commons file name prefix searched for each animal
+    WIKIMEDIA_NAMES = {
+        'koala': 'Koala',
+        'bear': 'Bear',
+        'deer': 'Deer',
+        'eagle': 'Eagle',
+        'dolphin': 'Dolphin',
+        'wolf': 'Wolf',
+        'raccoon': 'Raccoon',
+        'hedgehog': 'Hedgehog',
+        'otter': 'Otter',
+        'squirrel': 'Squirrel',
+    }
+    WIKIMEDIA_PAGE_SIZE = 50
+    EMBEDDABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+    # Upstream APIs and the animals they serve; each gets its own refill worker
+    UPSTREAMS = {
+        'thecatapi': ['cat'],
+        'thedogapi': ['dog'],
+        'randomfox': ['fox'],
+        'random-d.uk': ['duck'],
+        'wikimedia': sorted(WILDLIFE_ANIMALS),
+    }
+    # Most images a refill worker requests in one round
+    REFILL_BATCH = 10
+    # Database collection the pools are saved to, so they survive restarts
+    IMAGE_CACHE_COLLECTION = 'image_cache'
+    # Connection reuse: seconds DNS lookups are cached and idle connections kept open
+    DNS_CACHE_TTL = 300
+    KEEPALIVE_TIMEOUT = 30
+
     # Fallback images for all animals (multiple per animal for variety)
     FALLBACK_IMAGES = {
         'cat': [
@@ -132,30 +177,159 @@ class APIHandler:
         ],
     }
 
-    def __init__(self, timeout: int = 5, retry_count: int = 3, cache_hours: int = 0.08):
+    def __init__(self, timeout: int = 5, retry_count: int = 3, pool_size: int = 50, pool_ttl: float = 3600,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0, retry_budget: float = 8.0,
+                 max_concurrent_requests: int = 5):
         """Initialize API handler with configuration
         
         Args:
             timeout: API timeout in seconds
             retry_count: Number of retries for failed requests
-            cache_hours: Cache duration in hours (default 0.08 = ~5 minutes for variety)
+            pool_size: Image URLs kept per animal for serving at random
+            pool_ttl: Seconds a fetched image URL may be served from the pool
+            breaker_threshold: Consecutive failed requests before a host's circuit opens
+            breaker_reset: Seconds an open circuit waits before probing the host again
+            retry_budget: Most seconds one fetch may take, retries and waits included
+            max_concurrent_requests: Parallel requests allowed to each upstream host
         """
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.retry_count = retry_count
-        self.cache_duration = timedelta(hours=cache_hours)
-        self.cache: Dict[str, Dict] = {}  # {key: {'image': url, 'timestamp': datetime}}
+        self.retry_policy = RetryPolicy(attempts=retry_count, budget=retry_budget)
+        self.pool = ImagePool(pool_size, pool_ttl)
+        self.api_keys: Dict[str, str] = {}
+        self.low_water = 10
+        self.refill_interval = 60.0
+        self._wikimedia_continue: Dict[str, Optional[str]] = {}  # Next page token per animal
+        self._inflight: Dict[str, asyncio.Future] = {}  # Single-flight fetches by key
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers: Dict[str, CircuitBreaker] = {}  # Circuit breaker per upstream host
+        self._workers: Dict[str, asyncio.Task] = {}  # Refill worker per upstream
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._animal_upstreams = {animal: upstream for upstream, animals in self.UPSTREAMS.items() for animal in animals}
         self.session: Optional[aiohttp.ClientSession] = None
-        self.request_semaphore = asyncio.Semaphore(5)  # Max 5 concurrent requests
-        self.rate_limit_wait = 0  # Rate limit delay
+        self.db = None  # Where the pools are saved, set by load_pool()
+        self._saved_changes: Optional[int] = None
+        self._persist_task: Optional[asyncio.Task] = None
+        self._retiring: Dict[asyncio.Task, aiohttp.ClientSession] = {}  # Replaced sessions, closed once idle
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}  # Request slots per upstream host
+        self.rate_limits = RateLimits()  # Hosts that answered 429, and until when
+
+    @classmethod
+    def from_config(cls, config: APIConfig) -> 'APIHandler':
+        """Create a handler from the bot's API settings"""
+        handler = cls(
+            timeout=config.api_timeout,
+            retry_count=config.api_retry_count,
+            pool_size=config.image_pool_size,
+            pool_ttl=config.cache_timeout,
+            breaker_threshold=config.circuit_breaker_threshold,
+            breaker_reset=config.circuit_breaker_reset,
+            retry_budget=config.api_retry_budget,
+            max_concurrent_requests=config.max_concurrent_requests,
+        )
+        handler.low_water = max(1, min(config.image_pool_low_water, handler.pool.max_size))
+        return handler
+
+    def apply_config(self, config: APIConfig) -> None:
+        """Apply new API settings to a running handler
+
+        Pools are resized in place (keeping their URLs), breakers keep their
+        state, and a change in concurrency moves new requests onto a fresh
+        session while the old one finishes what it has in flight.
+        """
+        self.timeout = aiohttp.ClientTimeout(total=config.api_timeout)
+        self.retry_count = config.api_retry_count
+        self.retry_policy = RetryPolicy(attempts=config.api_retry_count, budget=config.api_retry_budget)
+        self.breaker_threshold = config.circuit_breaker_threshold
+        self.breaker_reset = config.circuit_breaker_reset
+        for breaker in self.breakers.values():
+            breaker.failure_threshold = max(1, config.circuit_breaker_threshold)
+            breaker.reset_timeout = config.circuit_breaker_reset
+        self.pool.resize(config.image_pool_size, ttl=config.cache_timeout)
+        self.low_water = max(1, min(config.image_pool_low_water, self.pool.max_size))
+        if config.max_concurrent_requests != self.max_concurrent_requests:
+            self.max_concurrent_requests = config.max_concurrent_requests
+            self.host_semaphores = {}  # Requests holding the old ones release them as usual
+            # The connector's limits are fixed, so retire the session it belongs to
+            if self.session is not None and not self.session.closed:
+                task = asyncio.create_task(self._close_later(self.session))
+                self._retiring[task] = self.session
+                task.add_done_callback(lambda done: self._retiring.pop(done, None))
+            self.session = None
+        for wakeup in self._wakeups.values():
+            wakeup.set()  # Top pools up to the new size / low-water mark
+
+    async def _close_later(self, session: aiohttp.ClientSession) -> None:
+        """Close a replaced session once no request on it can still be running"""
+        await asyncio.sleep(self.retry_policy.budget + self.timeout.total)
+        await session.close()
 
     async def get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(timeout=self.timeout)
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrent_requests * len(self.UPSTREAMS),
+                limit_per_host=self.max_concurrent_requests,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
         return self.session
 
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        """Request slots for a host, so a slow upstream can't starve the others"""
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.host_semaphores[host] = asyncio.Semaphore(self.max_concurrent_requests)
+        return semaphore
+
+    def start(self, api_keys: Optional[Dict[str, str]] = None, low_water: int = 10, refill_interval: float = 60.0,
+              persist_interval: float = 300.0) -> None:
+        """Start one background worker per upstream that keeps its pools filled
+
+        Once started, the get_*_image methods only read from the pools and
+        never wait on an API. ``api_keys`` maps 'cat' / 'dog' to API keys.
+        If the pools were loaded with ``load_pool()`` they are also saved
+        every ``persist_interval`` seconds (0 saves only on close).
+        """
+        self.api_keys = dict(api_keys or {})
+        self.low_water = max(1, min(low_water, self.pool.max_size))  # 0 would never refill
+        self.refill_interval = refill_interval
+        for upstream, animals in self.UPSTREAMS.items():
+            animals = [animal for animal in animals if self.has_api(animal, self.api_keys)]
+            if not animals or upstream in self._workers:
+                continue
+            self._wakeups[upstream] = asyncio.Event()
+            self._workers[upstream] = asyncio.create_task(self._refill_worker(upstream, animals))
+        if self.db is not None and persist_interval > 0 and self._persist_task is None:
+            self._persist_task = asyncio.create_task(self._persist_worker(persist_interval))
+        logger.info(f'Image pool workers started: {", ".join(self._workers) or "none"} (JSON: {decoding.JSON_BACKEND})')
+
     async def close(self) -> None:
-        """Close session safely"""
+        """Stop the refill workers and close the session safely"""
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._wakeups.clear()
+        if self._persist_task is not None:
+            self._persist_task.cancel()
+            await asyncio.gather(self._persist_task, return_exceptions=True)
+            self._persist_task = None
+        try:
+            await self.save_pool()
+        except Exception as e:
+            logger.error(f'Error saving image cache: {e}')
+        retiring = dict(self._retiring)
+        for task in retiring:
+            task.cancel()
+        await asyncio.gather(*retiring, return_exceptions=True)
+        for session in retiring.values():
+            if not session.closed:
+                await session.close()
         try:
             if self.session and not self.session.closed:
                 await self.session.close()
@@ -163,182 +337,390 @@ class APIHandler:
         except Exception as e:
             logger.error(f'Error closing session: {e}')
 
-    def _get_cache(self, key: str) -> Optional[str]:
-        """Get cached image if still valid"""
-        if key in self.cache:
-            data = self.cache[key]
-            if datetime.now() - data['timestamp'] < self.cache_duration:
-                return data['image']
-            else:
-                del self.cache[key]
-        return None
+    async def load_pool(self, db) -> int:
+        """Warm the pools from the image cache saved by the last run
 
-    def _set_cache(self, key: str, image_url: str) -> None:
-        """Cache image URL"""
-        self.cache[key] = {'image': image_url, 'timestamp': datetime.now()}
+        ``db`` is the bot's database; the pools are saved back to it
+        periodically once ``start()`` is called, and on ``close()``.
+        """
+        self.db = db
+        try:
+            saved = await db.aread(self.IMAGE_CACHE_COLLECTION)
+            added, skipped = self.pool.load(saved)
+        except Exception as e:
+            logger.warning(f'Could not load image cache: {e}')
+            return 0
+        if skipped:
+            logger.warning(f'Skipped {skipped} malformed image cache entries')
+        self._saved_changes = self.pool.changes
+        logger.info(f'Loaded {added} cached image URLs for {len(self.pool.stats())} animals')
+        return added
 
-    async def _fetch_with_retry(self, url: str, headers: Optional[Dict] = None) -> Optional[str]:
-        """Fetch URL with retry logic"""
-        async with self.request_semaphore:
-            for attempt in range(self.retry_count):
-                try:
-                    session = await self.get_session()
-                    async with session.get(url, headers=headers or {}, timeout=self.timeout) as resp:
-                        if resp.status == 200:
-                            return await resp.text()
-                        elif resp.status == 429:  # Rate limited
-                            retry_after = int(resp.headers.get('Retry-After', 60))
-                            logger.warning(f'Rate limited, waiting {retry_after}s')
-                            await asyncio.sleep(min(retry_after, 5))
-                        else:
-                            logger.debug(f'HTTP {resp.status} on attempt {attempt + 1}')
-                except asyncio.TimeoutError:
-                    logger.debug(f'Timeout on attempt {attempt + 1}/{self.retry_count}')
-                    if attempt < self.retry_count - 1:
-                        await asyncio.sleep(0.5)
-                except Exception as e:
-                    logger.debug(f'Request error: {e}')
-                    if attempt < self.retry_count - 1:
-                        await asyncio.sleep(0.5)
-        return None
+    async def save_pool(self) -> None:
+        """Save the unexpired pooled URLs, if anything changed since the last save"""
+        if self.db is None or self.pool.changes == self._saved_changes:
+            return
+        changes = self.pool.changes
+        data = {animal: [[url, fetched] for url, fetched in entries] for animal, entries in self.pool.export().items()}
+        await self.db.awrite(self.IMAGE_CACHE_COLLECTION, data)
+        self._saved_changes = changes
 
-    async def get_cat_image(self, api_key: str = '') -> str:
-        """Get cat image with caching and fallback"""
-        # Check cache first (but prefer API for variety)
-        cached = self._get_cache('cat')
-        if cached and not api_key:
-            return cached
-
-        # Try API if key provided - always fetch fresh images
-        if api_key:
+    async def _persist_worker(self, interval: float) -> None:
+        """Save the pools every ``interval`` seconds"""
+        while True:
+            await asyncio.sleep(interval)
             try:
-                url = 'https://api.thecatapi.com/v1/images/search'
-                headers = {'x-api-key': api_key}
-                response = await self._fetch_with_retry(url, headers)
-                if response:
-                    import json
-                    data = json.loads(response)
-                    if data and len(data) > 0 and 'url' in data[0]:
-                        image_url = data[0]['url']
-                        self._set_cache('cat', image_url)
-                        return image_url
+                await self.save_pool()
             except Exception as e:
-                logger.debug(f'Cat API error: {e}')
+                logger.warning(f'Error saving image cache: {e}')
 
-        # Fallback to random Unsplash image (no caching to ensure variety)
-        fallback = random.choice(self.FALLBACK_IMAGES['cat'])
-        return fallback
+    async def _pooled_image(self, animal: str, api_keys: Dict[str, str]) -> Optional[str]:
+        """Serve a random pooled image
 
-    async def get_dog_image(self, api_key: str = '') -> str:
-        """Get dog image with caching and fallback"""
-        # Check cache first (but prefer API for variety)
-        cached = self._get_cache('dog')
-        if cached and not api_key:
-            return cached
-
-        # Try API if key provided - always fetch fresh images
-        if api_key:
+        With the refill workers running this never touches the network: a
+        pool under the low-water mark just wakes its worker. Without them, an
+        empty pool is filled inline with a single fetch.
+        """
+        image_url = self.pool.get(animal)
+        upstream = self._animal_upstreams.get(animal)
+        if upstream in self._workers:
+            if image_url is None or self.pool.size(animal) < self.low_water:
+                self._wakeups[upstream].set()
+            return image_url
+        if image_url is None:
+            # Everyone who hits the empty pool at once shares the same fetch
+            image_url = await self._single_flight(f'image:{animal}', lambda: self._fetch_animal(animal, api_keys))
+            if image_url:
+                self.pool.add(animal, [image_url])
+        return image_url
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``factory()`` once for all concurrent callers with the same key
+
+        Later callers await the fetch already in flight instead of starting
+        their own. A cancelled caller doesn't cancel the shared fetch.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        return await asyncio.shield(future)
+
+    async def _refill_worker(self, upstream: str, animals: List[str]) -> None:
+        """Keep an upstream's pools above the low-water mark"""
+        wakeup = self._wakeups[upstream]
+        while True:
+            wakeup.clear()
+            for animal in animals:
+                try:
+                    await self._refill(animal)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.debug(f'Refill error for {animal} ({upstream}): {e}')
             try:
-                url = 'https://api.thedogapi.com/v1/images/search'
-                headers = {'x-api-key': api_key}
-                response = await self._fetch_with_retry(url, headers)
-                if response:
-                    import json
-                    data = json.loads(response)
-                    if data and len(data) > 0 and 'url' in data[0]:
-                        image_url = data[0]['url']
-                        self._set_cache('dog', image_url)
-                        return image_url
-            except Exception as e:
-                logger.debug(f'Dog API error: {e}')
+                await asyncio.wait_for(wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass  # Periodic check, pooled URLs may have expired
 
-        # Fallback to random Unsplash image (no caching to ensure variety)
-        fallback = random.choice(self.FALLBACK_IMAGES['dog'])
-        return fallback
+    async def _refill(self, animal: str) -> None:
+        """Fill an animal's pool back up once it is below the low-water mark"""
+        if self.pool.expire(animal) >= self.low_water:
+            return
+        while self.pool.size(animal) < self.pool.max_size:
+            count = min(self.REFILL_BATCH, self.pool.max_size - self.pool.size(animal))
+            added = self.pool.add(animal, await self._fetch_batch(animal, count))
+            if not added:
+                break  # Upstream failing or out of new images, try again next round
+        logger.debug(f'Refilled {animal} pool, {self.pool.size(animal)} pooled')
 
-    async def get_fox_image(self) -> str:
-        """Get fox image from RandomFox API with fallback"""
-        cached = self._get_cache('fox')
-        if cached:
-            return cached
+    def _breaker(self, host: str) -> CircuitBreaker:
+        """Get the circuit breaker for an upstream host"""
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host, self.breaker_threshold, self.breaker_reset)
+        return breaker
+
+    def circuit_states(self) -> Dict[str, Dict]:
+        """Circuit breaker state per upstream host, for monitoring"""
+        return {host: breaker.snapshot() for host, breaker in self.breakers.items()}
+
+    async def _request(self, url: str, headers: Optional[Dict], deadline: float):
+        """One GET holding a slot for its host, returns (status, raw body or None, Retry-After header)
+
+        Waiting for the slot counts against ``deadline`` (a ``time.monotonic()``
+        value); returns None without sending anything if no slot frees up in time.
+        """
+        semaphore = self._semaphore(urlparse(url).netloc)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            return None
+        try:
+            timeout = min(self.timeout.total, deadline - time.monotonic())
+            if timeout <= 0:
+                return None
+            session = await self.get_session()
+            async with session.get(url, headers=headers or {}, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status == 200:
+                    return resp.status, await resp.read(), None
+                return resp.status, None, resp.headers.get('Retry-After')
+        finally:
+            semaphore.release()
 
+    async def _fetch_with_retry(self, url: str, headers: Optional[Dict] = None) -> Optional[bytes]:
+        """Fetch URL with retries, failing fast while the host's circuit is open
+
+        Retries back off exponentially with full jitter, a host that answered
+        429 isn't called again until its Retry-After has passed, and the whole
+        call gives up once ``retry_policy.budget`` seconds are spent, time
+        spent queueing for a request slot included. Backoff and rate-limit
+        waits happen outside the request semaphore so they never hold a slot.
+        """
+        host = urlparse(url).netloc
+        breaker = self._breaker(host)
+        probing = breaker.state == CircuitBreaker.HALF_OPEN
+        if not breaker.allow():
+            logger.debug(f'Circuit open for {breaker.name}, skipping request')
+            return None
+        policy = self.retry_policy
+        attempts = 1 if probing else policy.attempts  # A probe is a single request to a host that was just down
+        deadline = policy.deadline()
+        failed = False  # Whether the host itself misbehaved (timeouts, 5xx, 429)
+        answered = False  # Whether any response came back at all
+        for attempt in range(attempts):
+            wait = self.rate_limits.wait_time(host)
+            if wait:
+                if time.monotonic() + wait >= deadline:
+                    logger.debug(f'{host} rate limited for {wait:.1f}s, over the retry budget')
+                    break
+                await asyncio.sleep(wait)
+            if deadline <= time.monotonic():
+                break
+            try:
+                response = await self._request(url, headers, deadline)
+                if response is None:
+                    logger.debug(f'No free request slot for {host} within the retry budget')
+                    break
+                status, body, retry_after = response
+            except asyncio.TimeoutError:
+                failed = True
+                logger.debug(f'Timeout on attempt {attempt + 1}/{attempts}')
+            except Exception as e:
+                failed = True
+                logger.debug(f'Request error: {e}')
+            else:
+                answered = True
+                if status == 200:
+                    if breaker.record_success():
+                        logger.info(f'Circuit closed for {breaker.name}, upstream recovered')
+                    return body
+                if status == 429:
+                    failed = True
+                    wait = self.rate_limits.limit(host, retry_after)
+                    logger.warning(f'Rate limited by {host}, holding requests for {wait:.1f}s')
+                    continue  # The rate limit wait replaces the backoff
+                logger.debug(f'HTTP {status} on attempt {attempt + 1}')
+                if status < 500:
+                    break  # Client errors won't change on retry
+                failed = True
+            if attempt < attempts - 1:
+                delay = policy.backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    break
+                await asyncio.sleep(delay)
+        if failed:
+            if breaker.record_failure():
+                logger.warning(f'Circuit opened for {breaker.name}, serving fallbacks for {breaker.reset_timeout:.0f}s')
+        elif answered:
+            breaker.record_success()  # Host answered, just not with an image (e.g. 404)
+        else:
+            breaker.release()  # Nothing was sent (rate limited / out of budget), state unchanged
+        return None
+
+    async def _fetch_search_api(self, url: str, api_key: str, limit: int = 1) -> List[str]:
+        """Fetch up to ``limit`` image URLs from TheCatAPI / TheDogAPI in one request"""
+        try:
+            response = await self._fetch_with_retry(f'{url}?limit={min(limit, self.SEARCH_PAGE_SIZE)}', {'x-api-key': api_key})
+            if response:
+                return decoding.search_urls(response)
+        except Exception as e:
+            logger.debug(f'Image search API error ({url}): {e}')
+        return []
+
+    async def _fetch_fox(self) -> Optional[str]:
+        """Fetch a fox image URL from RandomFox"""
         try:
             response = await self._fetch_with_retry('https://randomfox.ca/floof/')
             if response:
-                import json
-                data = json.loads(response)
-                if 'image' in data:
-                    image_url = data['image']
-                    self._set_cache('fox', image_url)
-                    return image_url
+                return decoding.field(response, 'image')
         except Exception as e:
             logger.debug(f'Fox API error: {e}')
+        return None
 
-        fallback = random.choice(self.FALLBACK_IMAGES['fox'])
-        return fallback
-
-    async def get_duck_image(self) -> str:
-        """Get duck image from RandomDuck API with fallback"""
-        cached = self._get_cache('duck')
-        if cached:
-            return cached
-
+    async def _fetch_duck(self) -> Optional[str]:
+        """Fetch a duck image URL from RandomDuck"""
         try:
             response = await self._fetch_with_retry('https://random-d.uk/api/random')
             if response:
-                import json
-                data = json.loads(response)
-                if 'url' in data:
-                    image_url = data['url']
-                    self._set_cache('duck', image_url)
-                    return image_url
+                return decoding.field(response, 'url')
         except Exception as e:
             logger.debug(f'Duck API error: {e}')
+        return None
 
-        fallback = random.choice(self.FALLBACK_IMAGES['duck'])
-        return fallback
-
-    async def get_wildlife_image(self, animal: str) -> str:
-        """Get wildlife image from Wikimedia API (works for multiple animals)"""
-        cached = self._get_cache(animal)
-        if cached:
-            return cached
-
-        # Map animals to their scientific or common names for API
-        animal_map = {
-            'koala': 'Koala',
-            'bear': 'Bear',
-            'deer': 'Deer',
-            'eagle': 'Eagle',
-            'dolphin': 'Dolphin',
-            'wolf': 'Wolf',
-            'raccoon': 'Raccoon',
-            'hedgehog': 'Hedgehog',
-            'otter': 'Otter',
-            'squirrel': 'Squirrel',
-        }
+    async def _fetch_wildlife_page(self, animal: str) -> List[str]:
+        """Fetch the next page of Wikimedia Commons images for an animal
 
-        animal_name = animal_map.get(animal.lower(), animal.title())
+        Pages continue from the ``aicontinue`` token of the previous call, so
+        successive calls walk through every matching file instead of
+        refetching the first page, wrapping round after the last one.
+        Concurrent calls for one animal share a single request.
+        """
+        return await self._single_flight(f'wikimedia:{animal}', lambda: self._request_wildlife_page(animal))
 
+    async def _request_wildlife_page(self, animal: str) -> List[str]:
+        """Request one page of Wikimedia Commons images for an animal"""
+        params = {
+            'action': 'query',
+            'list': 'allimages',
+            'aisort': 'name',
+            'aiprefix': self.WIKIMEDIA_NAMES.get(animal, animal.title()),
+            'ailimit': self.WIKIMEDIA_PAGE_SIZE,
+            'aiprop': 'url',
+            'format': 'json',
+        }
+        if self._wikimedia_continue.get(animal):
+            params['aicontinue'] = self._wikimedia_continue[animal]
         try:
-            # Try Pixabay-style API alternative or Unsplash API
-            url = f'https://commons.wikimedia.org/w/api.php?action=query&list=allimages&aisort=timestamp&aidir=descending&ailimit=50&aiprop=url&format=json&aifrom={animal_name}'
-            response = await self._fetch_with_retry(url)
+            response = await self._fetch_with_retry(f'https://commons.wikimedia.org/w/api.php?{urlencode(params)}')
             if response:
-                import json
-                data = json.loads(response)
-                if 'query' in data and 'allimages' in data['query'] and len(data['query']['allimages']) > 0:
-                    # Get random image from results
-                    images = data['query']['allimages']
-                    img_url = random.choice(images)['url']
-                    self._set_cache(animal, img_url)
-                    return img_url
+                # Discord can only embed actual pictures (no SVG, PDF, video, ...)
+                urls, token = decoding.wikimedia_page(response, self.EMBEDDABLE_EXTENSIONS)
+                self._wikimedia_continue[animal] = token
+                return urls
         except Exception as e:
             logger.debug(f'Wildlife API error for {animal}: {e}')
+        return []
 
-        # Fall back to random static image
-        fallback = random.choice(self.FALLBACK_IMAGES.get(animal.lower(), self.FALLBACK_IMAGES['cat']))
-        return fallback
+    async def _fetch_wildlife(self, animal: str) -> Optional[str]:
+        """Fetch a wildlife image URL, keeping the rest of the page in the pool"""
+        urls = await self._fetch_wildlife_page(animal.lower())
+        if not urls:
+            return None
+        self.pool.add(animal.lower(), urls)
+        return random.choice(urls)
+
+    async def get_cat_image(self, api_key: str = '') -> str:
+        """Get cat image from the pool with fallback"""
+        image_url = await self._pooled_image('cat', {'cat': api_key})
+        return image_url or random.choice(self.FALLBACK_IMAGES['cat'])
+
+    async def get_dog_image(self, api_key: str = '') -> str:
+        """Get dog image from the pool with fallback"""
+        image_url = await self._pooled_image('dog', {'dog': api_key})
+        return image_url or random.choice(self.FALLBACK_IMAGES['dog'])
+
+    async def get_fox_image(self) -> str:
+        """Get fox image (RandomFox API) from the pool with fallback"""
+        image_url = await self._pooled_image('fox', {})
+        return image_url or random.choice(self.FALLBACK_IMAGES['fox'])
+
+    async def get_duck_image(self) -> str:
+        """Get duck image (RandomDuck API) from the pool with fallback"""
+        image_url = await self._pooled_image('duck', {})
+        return image_url or random.choice(self.FALLBACK_IMAGES['duck'])
+
+    async def get_wildlife_image(self, animal: str) -> str:
+        """Get wildlife image (Wikimedia API) from the pool with fallback"""
+        animal = animal.lower()
+        image_url = await self._pooled_image(animal, {})
+        return image_url or random.choice(self.FALLBACK_IMAGES.get(animal, self.FALLBACK_IMAGES['cat']))
+
+    async def get_animal_image(self, animal: str, api_keys: Optional[Dict[str, str]] = None) -> str:
+        """Get an image for any animal from the right source
+
+        ``api_keys`` maps 'cat' / 'dog' to TheCatAPI / TheDogAPI keys.
+        """
+        api_keys = api_keys or {}
+        animal = animal.lower()
+        if animal == 'cat':
+            return await self.get_cat_image(api_keys.get('cat', ''))
+        if animal == 'dog':
+            return await self.get_dog_image(api_keys.get('dog', ''))
+        if animal == 'fox':
+            return await self.get_fox_image()
+        if animal == 'duck':
+            return await self.get_duck_image()
+        if animal in self.WILDLIFE_ANIMALS:
+            return await self.get_wildlife_image(animal)
+        return self.get_static_image(animal)
+
+    def has_api(self, animal: str, api_keys: Optional[Dict[str, str]] = None) -> bool:
+        """Whether images for an animal come from an API rather than the static list"""
+        if animal in ('cat', 'dog'):
+            return bool((api_keys or {}).get(animal))
+        return animal in ('fox', 'duck') or animal in self.WILDLIFE_ANIMALS
+
+    async def _fetch_animal(self, animal: str, api_keys: Dict[str, str]) -> Optional[str]:
+        """Fetch a fresh image URL for an animal, None if it has no API"""
+        if animal in self.SEARCH_APIS:
+            if not api_keys.get(animal):
+                return None
+            urls = await self._fetch_search_api(self.SEARCH_APIS[animal], api_keys[animal])
+            return urls[0] if urls else None
+        if animal == 'fox':
+            return await self._fetch_fox()
+        if animal == 'duck':
+            return await self._fetch_duck()
+        if animal in self.WILDLIFE_ANIMALS:
+            return await self._fetch_wildlife(animal)
+        return None
+
+    async def _fetch_batch(self, animal: str, count: int, api_keys: Optional[Dict[str, str]] = None) -> List[str]:
+        """Fetch at least ``count`` image URLs for an animal with as few requests as the API allows"""
+        api_keys = self.api_keys if api_keys is None else api_keys
+        if animal in self.SEARCH_APIS:
+            # Up to SEARCH_PAGE_SIZE images per request, until enough distinct ones came back
+            found: Dict[str, None] = {}
+            while len(found) < count:
+                page = await self._fetch_search_api(self.SEARCH_APIS[animal], api_keys.get(animal, ''), count - len(found))
+                before = len(found)
+                found.update(dict.fromkeys(page))
+                if len(found) == before:
+                    break
+            return list(found)
+        if animal in self.WILDLIFE_ANIMALS:
+            # Whole pages: one request covers up to WIKIMEDIA_PAGE_SIZE images
+            urls: List[str] = []
+            while len(urls) < count:
+                page = await self._fetch_wildlife_page(animal)
+                if not page:
+                    break
+                urls.extend(page)
+            return urls
+        results = await asyncio.gather(*(self._fetch_animal(animal, api_keys) for _ in range(count)))
+        return [url for url in results if url]
+
+    async def prefetch_images(self, animal: str, count: int, api_keys: Optional[Dict[str, str]] = None) -> List[str]:
+        """Get up to ``count`` distinct image URLs for an animal ahead of time
+
+        Pooled images are used first and only the shortfall is fetched (through
+        the shared request semaphore); fetched images join the pool. Animals
+        without an API return an empty list; callers fall back to
+        get_static_image().
+        """
+        animal = animal.lower()
+        api_keys = api_keys or {}
+        if count <= 0 or not self.has_api(animal, api_keys):
+            return []
+        urls = self.pool.sample(animal, count)
+        if len(urls) < count:
+            fetched = await self._fetch_batch(animal, count - len(urls), api_keys)
+            self.pool.add(animal, fetched)
+            sampled = set(urls)
+            urls += [url for url in dict.fromkeys(fetched) if url not in sampled][:count - len(urls)]
+        return urls
 
     def get_static_image(self, animal: str) -> str:
         """Get random fallback image for any animal (no API, always different)"""
@@ -349,6 +731,6 @@ class APIHandler:
         return random.choice(self.FALLBACK_IMAGES['cat'])
 
     def clear_cache(self) -> None:
-        """Clear all cached images"""
-        self.cache.clear()
+        """Clear all pooled images"""
+        self.pool.clear()
         logger.info('API cache cleared')
@@ -0,0 +1,79 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker (closed -> open -> half-open -> closed)
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    ``allow()`` refuses requests, so callers fall back immediately instead of
+    waiting on a dead host. Once ``reset_timeout`` seconds have passed a
+    single probe request is let through (half-open): success closes the
+    circuit, failure opens it again for another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the timeout has passed"""
+        if self.opened_at is None:
+            return self.CLOSED
+        if self._probe_started is not None or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a request may go out now (claims the probe when half-open)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        # A probe that never reported back (e.g. its task was cancelled) is given up on
+        now = time.monotonic()
+        if state == self.HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self.reset_timeout):
+            self._probe_started = now
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a probe claimed by ``allow()`` when no request was sent after all"""
+        self._probe_started = None
+
+    def record_success(self) -> bool:
+        """Note a successful request, returns True if this closed the circuit"""
+        was_open = self.opened_at is not None
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Note a failed request, returns True if this opened the circuit"""
+        self.failures += 1
+        if self._probe_started is not None or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self._probe_started = None
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for monitoring"""
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'times_opened': self.times_opened,
+            'retry_in': max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+            if self.opened_at is not None else 0.0,
+        }
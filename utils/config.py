@@ -0,0 +1,50 @@
+import math
+from typing import Any, Dict
+
+
+class APIConfig:
+    """Tunable image API settings, read from ``bot.config``
+
+    Attribute names are the ``bot.config`` keys, so a setting changed at
+    runtime (``!apiconfig set``) can be written straight back to the bot
+    config. Instances are treated as immutable; ``replace()`` returns a
+    validated copy.
+    """
+
+    # bot.config key -> (type, default, minimum)
+    FIELDS = {
+        'api_timeout': (float, 5.0, 0.1),
+        'api_retry_count': (int, 3, 1),
+        'api_retry_budget': (float, 8.0, 0.1),
+        'max_concurrent_requests': (int, 5, 1),
+        'cache_timeout': (float, 3600.0, 1.0),
+        'image_pool_size': (int, 50, 1),
+        'image_pool_low_water': (int, 10, 1),
+        'circuit_breaker_threshold': (int, 5, 1),
+        'circuit_breaker_reset': (float, 30.0, 1.0),
+    }
+
+    def __init__(self, **values: Any):
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise KeyError(f'Unknown API setting: {", ".join(sorted(unknown))}')
+        for key, (cast, default, minimum) in self.FIELDS.items():
+            value = cast(values.get(key, default))
+            if not math.isfinite(value):
+                raise ValueError(f'{key} must be a finite number')
+            if value < minimum:
+                raise ValueError(f'{key} must be at least {minimum}')
+            setattr(self, key, value)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'APIConfig':
+        """Build from the bot config, using defaults for missing keys"""
+        return cls(**{key: config[key] for key in cls.FIELDS if config.get(key) is not None})
+
+    def replace(self, **changes: Any) -> 'APIConfig':
+        """Copy with some settings changed (raises KeyError / ValueError if invalid)"""
+        return APIConfig(**{**self.as_dict(), **changes})
+
+    def as_dict(self) -> Dict[str, Any]:
+        """All settings by bot.config key"""
+        return {key: getattr(self, key) for key in self.FIELDS}
@@ -1,120 +1,959 @@
+import asyncio
+import copy
+import functools
+import itertools
 import json
 import os
+import re
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, TextIO, Tuple
 from datetime import datetime
+from .aggregator import CounterAggregator, CounterDeltas
+from .serializers import EXTENSIONS, detect_serializer, get_serializer
+from .stats_log import StatsEventLog
 
 class JSONDatabase:
-    """Simple JSON-based database manager with configurable directory"""
+    """Simple JSON-based database manager with configurable directory
 
-    def __init__(self, db_dir: str = 'data'):
+    With ``write_back=True`` every collection is kept in memory after its first
+    load. Mutations are applied in RAM and mark the collection dirty; a
+    background thread flushes dirty collections every ``flush_interval``
+    seconds and ``close()`` flushes whatever is left at shutdown. Every
+    key-level mutation is also appended to ``<collection>.journal`` and
+    replayed on load, so changes made since the last flush survive a crash.
+
+    Collection files are always replaced atomically (temp file + rename).
+    Each collection has its own lock (see ``lock()``); ``update()`` and
+    ``compare_and_set()`` give atomic read-modify-write on a single key.
+
+    ``serializer`` picks the on-disk format: ``json-pretty`` (default,
+    human-readable), ``json`` (compact), ``msgpack`` or ``marshal``. Files in
+    any format are detected and read; ``convert_all()`` rewrites them in the
+    configured one.
+
+    ``shards`` maps collection names to a shard count, e.g.
+    ``{'user_stats': 16}``. Keys of a sharded collection are spread over that
+    many files by hash, so key-level operations only load and rewrite one
+    shard. Files from a different layout are redistributed on first access.
+
+    ``iter_items()`` streams a collection shard by shard in batches instead of
+    copying it whole, for scans over large collections.
+
+    Coroutines should use the ``a``-prefixed methods (``aget``, ``aset``, ...),
+    which run the blocking call on a dedicated worker thread instead of the
+    event loop.
+    """
+
+    def __init__(self, db_dir: str = 'data', write_back: bool = False, flush_interval: float = 5.0,
+                 serializer: str = 'json-pretty', shards: Optional[Dict[str, int]] = None):
         self.db_dir = Path(db_dir)
         self.db_dir.mkdir(exist_ok=True)
+        self.serializer = get_serializer(serializer)
+        self.shards = {name: count for name, count in (shards or {}).items() if count and count > 1}
+        self._layout_checked: Set[str] = set()
+        self._settled: Set[str] = set()  # Files whose leftover journals were folded in (write-through)
+        self.write_back = write_back
+        self.flush_interval = flush_interval
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self._journals: Dict[str, TextIO] = {}
+        self._lock = threading.RLock()
+        self._locks: Dict[str, threading.RLock] = {}
+        self._flush_lock = threading.Lock()
+        self._stop_flushing = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='JSONDatabase-io')
+        if write_back and flush_interval > 0:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name='JSONDatabase-flush', daemon=True
+            )
+            self._flush_thread.start()
+
+    def lock(self, collection: str) -> threading.RLock:
+        """Get the lock guarding a collection
+
+        Every method holds it while it works on the collection; hold it yourself
+        to make a longer read-modify-write sequence atomic. Shard files share
+        the lock of their collection.
+        """
+        collection = collection.split('.', 1)[0]
+        with self._lock:
+            lock = self._locks.get(collection)
+            if lock is None:
+                lock = self._locks[collection] = threading.RLock()
+            return lock
+
+    _FILE_NAME = re.compile(r'^(?P<collection>[^.]+)(?:\.s(?P<count>\d+)-(?P<index>\d+))?$')
+    _FILE_SUFFIXES = EXTENSIONS + ('.journal', '.journal.flushing')
+
+    @staticmethod
+    def _shard_file(collection: str, index: int, count: int) -> str:
+        return f"{collection}.s{count}-{index:03d}"
+
+    def _shard_name(self, collection: str, key: str) -> str:
+        """Get the file name that stores a key"""
+        self._check_layout(collection)
+        return self._shard_for(collection, key)
+
+    def _shard_for(self, collection: str, key: str) -> str:
+        """File name for a key under the configured layout, without checking it"""
+        count = self.shards.get(collection)
+        if not count:
+            return collection
+        return self._shard_file(collection, zlib.crc32(str(key).encode('utf-8')) % count, count)
+
+    def _shard_names(self, collection: str) -> List[str]:
+        """Get every file name of a collection"""
+        self._check_layout(collection)
+        count = self.shards.get(collection)
+        if not count:
+            return [collection]
+        return [self._shard_file(collection, index, count) for index in range(count)]
+
+    def _check_layout(self, collection: str) -> None:
+        """Redistribute files written with another shard layout, once per collection
+
+        The new shard files are written straight to disk, bypassing the
+        write-back cache, so this never waits on (or for) the flush thread.
+        """
+        if collection in self._layout_checked:
+            return
+        with self.lock(collection):
+            if collection in self._layout_checked:
+                return
+            count = self.shards.get(collection)
+            expected = {self._shard_file(collection, i, count) for i in range(count)} if count else {collection}
+            stale = set()
+            for path in self.db_dir.iterdir():
+                for suffix in self._FILE_SUFFIXES:
+                    if path.name.endswith(suffix):
+                        match = self._FILE_NAME.match(path.name[:-len(suffix)])
+                        if match and match['collection'] == collection and match[0] not in expected:
+                            stale.add(match[0])
+                        break
+            if stale:
+                self._redistribute(collection, stale)
+                print(f"Redistributed {collection} from {len(stale)} file(s) into {len(expected)} file(s)")
+            self._layout_checked.add(collection)
+
+    def _redistribute(self, collection: str, stale: Set[str]) -> None:
+        """Move every key of the stale files into its file under the current layout"""
+        buckets: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(stale):
+            data = self._load(name)
+            self._replay_journal(name, data)
+            for key, value in data.items():
+                buckets.setdefault(self._shard_for(collection, key), {})[key] = value
+        for name, values in buckets.items():
+            data = self._load(name)
+            self._replay_journal(name, data)
+            data.update(values)
+            if not self._dump(name, self._serialize(data)):
+                raise RuntimeError(f"Could not write {name} while redistributing {collection}")
+            self._drop_journals(name)
+        for name in stale:
+            self._drop_journals(name)
+            path = self._find_path(name)
+            while path is not None:
+                path.unlink()
+                path = self._find_path(name)
+
+    def _drop_journals(self, name: str) -> None:
+        """Forget a file's cached copy and delete its journals, once they are on disk"""
+        self._cache.pop(name, None)
+        self._dirty.discard(name)
+        handle = self._journals.pop(name, None)
+        if handle is not None:
+            handle.close()
+        for path in (self._get_journal_path(name), self.db_dir / f"{name}.journal.flushing"):
+            if path.exists():
+                path.unlink()
 
     def _get_path(self, collection: str) -> Path:
         """Get the file path for a collection"""
-        return self.db_dir / f"{collection}.json"
+        return self.db_dir / f"{collection}{self.serializer.extension}"
 
-    def read(self, collection: str) -> Dict[str, Any]:
-        """Read entire collection"""
+    def _find_path(self, collection: str) -> Optional[Path]:
+        """Find the file a collection is stored in, in whatever format"""
         path = self._get_path(collection)
-        if not path.exists():
+        if path.exists():
+            return path
+        for extension in EXTENSIONS:
+            other = self.db_dir / f"{collection}{extension}"
+            if other.exists():
+                return other
+        return None
+
+    def _get_journal_path(self, collection: str) -> Path:
+        """Get the journal file path for a collection"""
+        return self.db_dir / f"{collection}.journal"
+
+    def _load(self, collection: str) -> Dict[str, Any]:
+        """Load a collection from disk"""
+        path = self._find_path(collection)
+        if path is None:
             return {}
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            return detect_serializer(raw).loads(raw)
+        except ValueError as e:
+            # Keep the damaged file around instead of overwriting it on the next write
+            corrupt_path = path.with_name(f"{path.name}.corrupt-{datetime.now():%Y%m%d%H%M%S}")
+            print(f"Error reading {collection}: {e} - moved to {corrupt_path.name}")
+            try:
+                os.replace(path, corrupt_path)
+            except OSError:
+                pass
             return {}
+        except RuntimeError:
+            raise
         except Exception as e:
             print(f"Error reading {collection}: {e}")
             return {}
 
-    def write(self, collection: str, data: Dict[str, Any]) -> None:
-        """Write entire collection"""
+    def _dump(self, collection: str, payload: bytes) -> bool:
+        """Atomically write serialized collection to disk"""
+        path = self._get_path(collection)
+        tmp_path = path.with_name(f"{path.name}.tmp")
         try:
-            path = self._get_path(collection)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            # Drop copies left in a previously configured format
+            for extension in EXTENSIONS:
+                if extension != self.serializer.extension:
+                    other = self.db_dir / f"{collection}{extension}"
+                    if other.exists():
+                        other.unlink()
+            return True
         except Exception as e:
             print(f"Error writing {collection}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return False
+
+    def _journal(self, collection: str, entry: Dict[str, Any]) -> None:
+        """Append a mutation to the collection journal"""
+        try:
+            handle = self._journals.get(collection)
+            if handle is None:
+                handle = open(self._get_journal_path(collection), 'a', encoding='utf-8')
+                self._journals[collection] = handle
+            handle.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            handle.flush()
+        except Exception as e:
+            print(f"Error journaling {collection}: {e}")
+
+    def _rotate_journal(self, collection: str) -> Optional[Path]:
+        """Move the journal aside so new mutations start a fresh one
+
+        Returns the path of the rotated journal, which can be deleted once the
+        snapshot covering it has been written.
+        """
+        handle = self._journals.pop(collection, None)
+        if handle is not None:
+            handle.close()
+        path = self._get_journal_path(collection)
+        rotated = path.with_name(f"{path.name}.flushing")
+        if not path.exists():
+            return rotated if rotated.exists() else None
+        try:
+            if rotated.exists():
+                # A previous flush failed; keep its entries ahead of the new ones
+                with open(rotated, 'a', encoding='utf-8') as dst, open(path, 'r', encoding='utf-8') as src:
+                    dst.write(src.read())
+                path.unlink()
+            else:
+                os.replace(path, rotated)
+        except OSError as e:
+            print(f"Error rotating journal for {collection}: {e}")
+            return None
+        return rotated
+
+    def _replay_journal(self, collection: str, data: Dict[str, Any]) -> int:
+        """Apply journaled mutations on top of a loaded snapshot"""
+        path = self._get_journal_path(collection)
+        replayed = 0
+        for journal_path in (path.with_name(f"{path.name}.flushing"), path):
+            if not journal_path.exists():
+                continue
+            try:
+                with open(journal_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # Torn last line from a crash mid-append
+                        op = entry.get('op')
+                        if op == 'set':
+                            data[entry['key']] = entry['value']
+                        elif op == 'delete':
+                            data.pop(entry['key'], None)
+                        elif op == 'replace':
+                            data.clear()
+                            data.update(entry['value'])
+                        replayed += 1
+            except Exception as e:
+                print(f"Error replaying journal for {collection}: {e}")
+        return replayed
+
+    def _serialize(self, data: Dict[str, Any]) -> bytes:
+        """Serialize collection data"""
+        return self.serializer.dumps(data)
+
+    def convert_all(self) -> List[str]:
+        """Rewrite collections stored in another format in the configured one"""
+        converted = []
+        for path in sorted(self.db_dir.iterdir()):
+            if path.suffix not in EXTENSIONS or path.suffix == self.serializer.extension:
+                continue
+            collection = path.stem
+            with self.lock(collection):
+                data = self._read_file(collection)
+                if self.write_back:
+                    self._dirty.add(collection)
+                elif not self._dump(collection, self._serialize(data)):
+                    continue
+            converted.append(collection)
+        if self.write_back:
+            self.flush()
+        return converted
+
+    def _settle_journals(self, collection: str) -> None:
+        """Fold journals left by a write-back run into the file, once per file
+
+        Write-through mode never reads journals, so without this a journal
+        from an earlier crash would sit on disk and later be replayed over
+        newer data by the next write-back start.
+        """
+        if collection in self._settled:
+            return
+        with self.lock(collection):
+            if collection in self._settled:
+                return
+            journal_path = self._get_journal_path(collection)
+            if journal_path.exists() or journal_path.with_name(f"{journal_path.name}.flushing").exists():
+                data = self._load(collection)
+                replayed = self._replay_journal(collection, data)
+                if not self._dump(collection, self._serialize(data)):
+                    return  # Journals stay, try again on the next access
+                self._drop_journals(collection)
+                print(f"Applied {replayed} journaled change(s) to {collection}")
+            self._settled.add(collection)
+
+    def _read_file(self, collection: str) -> Dict[str, Any]:
+        """Read a single collection or shard file"""
+        if not self.write_back:
+            self._settle_journals(collection)
+            return self._load(collection)
+        with self.lock(collection):
+            if collection not in self._cache:
+                data = self._load(collection)
+                if self._replay_journal(collection, data):
+                    self._dirty.add(collection)
+                self._cache[collection] = data
+            return self._cache[collection]
+
+    def _write_file(self, collection: str, data: Dict[str, Any]) -> None:
+        """Write a single collection or shard file"""
+        if not self.write_back:
+            self._settle_journals(collection)
+            try:
+                self._dump(collection, self._serialize(data))
+            except Exception as e:
+                print(f"Error writing {collection}: {e}")
+            return
+        with self.lock(collection):
+            self._cache[collection] = data
+            self._dirty.add(collection)
+            self._journal(collection, {'op': 'replace', 'value': data})
+
+    def read(self, collection: str) -> Dict[str, Any]:
+        """Read entire collection"""
+        names = self._shard_names(collection)
+        if names == [collection]:
+            return self._read_file(collection)
+        merged = {}
+        with self.lock(collection):
+            for name in names:
+                merged.update(self._read_file(name))
+        return merged
+
+    def write(self, collection: str, data: Dict[str, Any]) -> None:
+        """Write entire collection"""
+        names = self._shard_names(collection)
+        if names == [collection]:
+            self._write_file(collection, data)
+            return
+        buckets = {name: {} for name in names}
+        for key, value in data.items():
+            buckets[self._shard_name(collection, key)][str(key)] = value
+        with self.lock(collection):
+            for name, values in buckets.items():
+                self._write_file(name, values)
+
+    def _commit(self, collection: str, data: Dict[str, Any], key: str) -> None:
+        """Persist a change to a single key of a collection read with read()"""
+        if not self.write_back:
+            self._write_file(collection, data)
+            return
+        self._dirty.add(collection)
+        if key in data:
+            self._journal(collection, {'op': 'set', 'key': key, 'value': data[key]})
+        else:
+            self._journal(collection, {'op': 'delete', 'key': key})
+
+    def flush(self) -> None:
+        """Write all dirty collections to disk (write-back mode)"""
+        # Serialize under the collection lock, do the slow disk writes outside of it.
+        # The flush lock keeps an older snapshot from overwriting a newer one.
+        with self._flush_lock:
+            with self._lock:
+                dirty = list(self._dirty)
+            pending = {}
+            for collection in dirty:
+                with self.lock(collection):
+                    try:
+                        payload = self._serialize(self._cache[collection])
+                    except Exception as e:
+                        print(f"Error serializing {collection}: {e}")
+                        continue
+                    pending[collection] = (payload, self._rotate_journal(collection))
+                    self._dirty.discard(collection)
+            for collection, (payload, journal_path) in pending.items():
+                if not self._dump(collection, payload):
+                    self._dirty.add(collection)
+                    continue
+                if journal_path is not None:
+                    try:
+                        journal_path.unlink()
+                    except OSError:
+                        pass
+
+    def _flush_loop(self) -> None:
+        """Background thread flushing dirty collections periodically"""
+        while not self._stop_flushing.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flush thread and write pending changes"""
+        self._stop_flushing.set()
+        if self._flush_thread and self._flush_thread is not threading.current_thread():
+            self._flush_thread.join(timeout=self.flush_interval + 5)
+        self._flush_thread = None
+        self._executor.shutdown(wait=True)
+        if self.write_back:
+            self.flush()
+        with self._lock:
+            for handle in self._journals.values():
+                handle.close()
+            self._journals.clear()
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking database call on the worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
 
     def get(self, collection: str, key: str, default: Any = None) -> Any:
         """Get single value from collection"""
-        data = self.read(collection)
-        return data.get(str(key), default)
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            value = data.get(str(key), default)
+            # Hand out copies so callers can't mutate the cache behind our back
+            return copy.deepcopy(value) if self.write_back else value
 
     def set(self, collection: str, key: str, value: Any) -> None:
         """Set single value in collection"""
-        data = self.read(collection)
-        data[str(key)] = value
-        self.write(collection, data)
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            data[str(key)] = value
+            self._commit(name, data, str(key))
 
     def exists(self, collection: str, key: str) -> bool:
         """Check if key exists"""
-        data = self.read(collection)
+        data = self._read_file(self._shard_name(collection, key))
         return str(key) in data
 
     def delete(self, collection: str, key: str) -> bool:
         """Delete key from collection"""
-        data = self.read(collection)
-        if str(key) in data:
-            del data[str(key)]
-            self.write(collection, data)
-            return True
-        return False
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            if str(key) in data:
+                del data[str(key)]
+                self._commit(name, data, str(key))
+                return True
+            return False
 
     def push(self, collection: str, key: str, item: Any) -> None:
         """Push item to array in collection"""
-        data = self.read(collection)
-        if str(key) not in data:
-            data[str(key)] = []
-        if not isinstance(data[str(key)], list):
-            data[str(key)] = []
-        data[str(key)].append(item)
-        self.write(collection, data)
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            if str(key) not in data:
+                data[str(key)] = []
+            if not isinstance(data[str(key)], list):
+                data[str(key)] = []
+            data[str(key)].append(item)
+            self._commit(name, data, str(key))
 
     def pull(self, collection: str, key: str, item: Any) -> bool:
         """Remove item from array in collection"""
-        data = self.read(collection)
-        if str(key) in data and isinstance(data[str(key)], list):
-            try:
-                data[str(key)].remove(item)
-                self.write(collection, data)
-                return True
-            except ValueError:
-                return False
-        return False
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            if str(key) in data and isinstance(data[str(key)], list):
+                try:
+                    data[str(key)].remove(item)
+                    self._commit(name, data, str(key))
+                    return True
+                except ValueError:
+                    return False
+            return False
 
     def increment(self, collection: str, key: str, amount: int = 1) -> None:
         """Increment numeric value in collection"""
-        data = self.read(collection)
-        current = data.get(str(key), 0)
-        data[str(key)] = current + amount
-        self.write(collection, data)
+        with self.lock(collection):
+            name = self._shard_name(collection, key)
+            data = self._read_file(name)
+            current = data.get(str(key), 0)
+            data[str(key)] = current + amount
+            self._commit(name, data, str(key))
+
+    def update(self, collection: str, key: str, func: Callable[[Any], Any], default: Any = None) -> Any:
+        """Atomically replace a value with ``func(current)`` and return the result"""
+        with self.lock(collection):
+            value = func(self.get(collection, key, copy.deepcopy(default)))
+            self.set(collection, key, value)
+            return value
+
+    def compare_and_set(self, collection: str, key: str, expected: Any, value: Any) -> bool:
+        """Set a value only if the current one equals ``expected``"""
+        with self.lock(collection):
+            if self.get(collection, key) != expected:
+                return False
+            self.set(collection, key, value)
+            return True
+
+    def get_many(self, collection: str, keys: List[str]) -> Dict[str, Any]:
+        """Get several values from collection with a single read per shard"""
+        buckets: Dict[str, List[str]] = {}
+        for key in keys:
+            buckets.setdefault(self._shard_name(collection, key), []).append(str(key))
+        found = {}
+        with self.lock(collection):
+            for name, shard_keys in buckets.items():
+                data = self._read_file(name)
+                for key in shard_keys:
+                    if key in data:
+                        found[key] = data[key]
+            return copy.deepcopy(found) if self.write_back else found
+
+    def set_many(self, collection: str, values: Dict[str, Any]) -> None:
+        """Set several values in collection with a single write"""
+        if not values:
+            return
+        buckets: Dict[str, Dict[str, Any]] = {}
+        for key, value in values.items():
+            buckets.setdefault(self._shard_name(collection, key), {})[str(key)] = value
+        with self.lock(collection):
+            for name, shard_values in buckets.items():
+                data = self._read_file(name)
+                data.update(shard_values)
+                if not self.write_back:
+                    self._write_file(name, data)
+                    continue
+                for key in shard_values:
+                    self._commit(name, data, key)
 
     def all(self, collection: str) -> Dict[str, Any]:
         """Get all data from collection"""
-        return self.read(collection)
+        with self.lock(collection):
+            data = self.read(collection)
+            return copy.deepcopy(data) if self.write_back else data
 
     def clear(self, collection: str) -> None:
         """Clear entire collection"""
-        self.write(collection, {})
+        with self.lock(collection):
+            self.write(collection, {})
 
     def size(self, collection: str) -> int:
         """Get number of keys in collection"""
-        return len(self.read(collection))
+        with self.lock(collection):
+            return sum(len(self._read_file(name)) for name in self._shard_names(collection))
 
     def keys(self, collection: str) -> List[str]:
         """Get all keys in collection"""
-        return list(self.read(collection).keys())
+        with self.lock(collection):
+            return [key for name in self._shard_names(collection) for key in self._read_file(name)]
 
     def values(self, collection: str) -> List[Any]:
         """Get all values in collection"""
-        return list(self.read(collection).values())
+        return [value for _, value in self.iter_items(collection)]
 
     def items(self, collection: str) -> List[tuple]:
         """Get all items in collection"""
-        return list(self.read(collection).items())
+        return list(self.iter_items(collection))
+
+    def iter_items(self, collection: str, prefix: Optional[str] = None,
+                   batch_size: int = 500) -> Iterator[Tuple[str, Any]]:
+        """Stream (key, value) pairs, optionally only keys starting with ``prefix``
+
+        Shards are visited one at a time. In write-back mode the cached keys are
+        snapshotted and values are copied ``batch_size`` at a time, so the lock
+        is never held while the caller works; otherwise each file is parsed
+        incrementally from disk. Keys written during the scan may be missed.
+        """
+        for name in self._shard_names(collection):
+            if not self.write_back:
+                yield from self._stream_file(name, prefix)
+                continue
+            with self.lock(name):
+                keys = [key for key in self._read_file(name) if prefix is None or key.startswith(prefix)]
+            for start in range(0, len(keys), batch_size):
+                with self.lock(name):
+                    data = self._read_file(name)
+                    batch = [(key, copy.deepcopy(data[key])) for key in keys[start:start + batch_size] if key in data]
+                yield from batch
+
+    def _stream_file(self, collection: str, prefix: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+        """Parse a collection file member by member without loading it whole"""
+        self._settle_journals(collection)
+        path = self._find_path(collection)
+        if path is None:
+            return
+        try:
+            with open(path, 'rb') as f:
+                serializer = detect_serializer(f.read(16))
+                f.seek(0)
+                for key, value in serializer.iter_items(f):
+                    if prefix is None or key.startswith(prefix):
+                        yield key, value
+        except (OSError, ValueError) as e:
+            print(f"Error streaming {collection}: {e}")
+
+    # ==================== ASYNC API ====================
+    async def aread(self, collection: str) -> Dict[str, Any]:
+        return await self.run(self.read, collection)
+
+    async def awrite(self, collection: str, data: Dict[str, Any]) -> None:
+        await self.run(self.write, collection, data)
+
+    async def aflush(self) -> None:
+        await self.run(self.flush)
+
+    async def aget(self, collection: str, key: str, default: Any = None) -> Any:
+        return await self.run(self.get, collection, key, default)
+
+    async def aset(self, collection: str, key: str, value: Any) -> None:
+        await self.run(self.set, collection, key, value)
+
+    async def aexists(self, collection: str, key: str) -> bool:
+        return await self.run(self.exists, collection, key)
+
+    async def aupdate(self, collection: str, key: str, func: Callable[[Any], Any], default: Any = None) -> Any:
+        return await self.run(self.update, collection, key, func, default)
+
+    async def acompare_and_set(self, collection: str, key: str, expected: Any, value: Any) -> bool:
+        return await self.run(self.compare_and_set, collection, key, expected, value)
+
+    async def aget_many(self, collection: str, keys: List[str]) -> Dict[str, Any]:
+        return await self.run(self.get_many, collection, keys)
+
+    async def aset_many(self, collection: str, values: Dict[str, Any]) -> None:
+        await self.run(self.set_many, collection, values)
+
+    async def adelete(self, collection: str, key: str) -> bool:
+        return await self.run(self.delete, collection, key)
+
+    async def apush(self, collection: str, key: str, item: Any) -> None:
+        await self.run(self.push, collection, key, item)
+
+    async def apull(self, collection: str, key: str, item: Any) -> bool:
+        return await self.run(self.pull, collection, key, item)
+
+    async def aincrement(self, collection: str, key: str, amount: int = 1) -> None:
+        await self.run(self.increment, collection, key, amount)
+
+    async def aall(self, collection: str) -> Dict[str, Any]:
+        return await self.run(self.all, collection)
+
+    async def aclear(self, collection: str) -> None:
+        await self.run(self.clear, collection)
+
+    async def asize(self, collection: str) -> int:
+        return await self.run(self.size, collection)
+
+    async def akeys(self, collection: str) -> List[str]:
+        return await self.run(self.keys, collection)
+
+    async def avalues(self, collection: str) -> List[Any]:
+        return await self.run(self.values, collection)
+
+    async def aitems(self, collection: str) -> List[tuple]:
+        return await self.run(self.items, collection)
+
+    async def aiter_items(self, collection: str, prefix: Optional[str] = None,
+                          batch_size: int = 500) -> AsyncIterator[Tuple[str, Any]]:
+        """Async version of iter_items(), each batch is fetched on the worker thread"""
+        iterator = self.iter_items(collection, prefix, batch_size)
+        while True:
+            batch = await self.run(lambda: list(itertools.islice(iterator, batch_size)))
+            if not batch:
+                return
+            for item in batch:
+                yield item
+
+
+class SQLiteDatabase(JSONDatabase):
+    """SQLite-backed database with the same interface as JSONDatabase
+
+    Each collection is a table keyed by primary key with a JSON value column,
+    so single-key reads and writes no longer touch the whole collection.
+    """
+
+    _COLLECTION_NAME = re.compile(r'^[A-Za-z0-9_]+$')
+
+    def __init__(self, db_dir: str = 'data', filename: str = 'animalverse.db'):
+        super().__init__(db_dir=db_dir)
+        self.db_path = self.db_dir / filename
+        self._tables: Set[str] = set()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+
+    def lock(self, collection: str) -> threading.RLock:
+        """All collections share one connection, so they share one lock"""
+        return self._lock
+
+    def _table(self, collection: str) -> str:
+        """Get the quoted table name for a collection, creating it if needed"""
+        if not self._COLLECTION_NAME.match(collection):
+            raise ValueError(f"Invalid collection name: {collection!r}")
+        if collection not in self._tables:
+            with self._conn:
+                self._conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{collection}" '
+                    '(key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+                )
+            self._tables.add(collection)
+        return f'"{collection}"'
+
+    def _has_table(self, collection: str) -> bool:
+        """Check if a collection table already exists"""
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (collection,)
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        return json.loads(text)
+
+    def read(self, collection: str) -> Dict[str, Any]:
+        """Read entire collection"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(f'SELECT key, value FROM {self._table(collection)}').fetchall()
+            return {key: self._decode(value) for key, value in rows}
+        except Exception as e:
+            print(f"Error reading {collection}: {e}")
+            return {}
+
+    def write(self, collection: str, data: Dict[str, Any]) -> None:
+        """Write entire collection"""
+        try:
+            with self._lock, self._conn:
+                table = self._table(collection)
+                self._conn.execute(f'DELETE FROM {table}')
+                self._conn.executemany(
+                    f'INSERT INTO {table} (key, value) VALUES (?, ?)',
+                    ((str(key), self._encode(value)) for key, value in data.items())
+                )
+        except Exception as e:
+            print(f"Error writing {collection}: {e}")
+
+    def flush(self) -> None:
+        """Nothing to flush, every change is committed immediately"""
+
+    def close(self) -> None:
+        """Close the database connection"""
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+    def get(self, collection: str, key: str, default: Any = None) -> Any:
+        """Get single value from collection"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value FROM {self._table(collection)} WHERE key = ?', (str(key),)
+            ).fetchone()
+        return self._decode(row[0]) if row else default
+
+    def set(self, collection: str, key: str, value: Any) -> None:
+        """Set single value in collection"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self._table(collection)} (key, value) VALUES (?, ?)',
+                (str(key), self._encode(value))
+            )
+
+    def get_many(self, collection: str, keys: List[str]) -> Dict[str, Any]:
+        """Get several values from collection with a single query per 500 keys"""
+        keys = [str(key) for key in keys]
+        found = {}
+        with self._lock:
+            table = self._table(collection)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, value FROM {table} WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update((key, self._decode(value)) for key, value in rows)
+        return found
+
+    def set_many(self, collection: str, values: Dict[str, Any]) -> None:
+        """Set several values in collection in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO {self._table(collection)} (key, value) VALUES (?, ?)',
+                ((str(key), self._encode(value)) for key, value in values.items())
+            )
+
+    def exists(self, collection: str, key: str) -> bool:
+        """Check if key exists"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT 1 FROM {self._table(collection)} WHERE key = ?', (str(key),)
+            ).fetchone()
+        return row is not None
+
+    def delete(self, collection: str, key: str) -> bool:
+        """Delete key from collection"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f'DELETE FROM {self._table(collection)} WHERE key = ?', (str(key),)
+            )
+            return cursor.rowcount > 0
+
+    def push(self, collection: str, key: str, item: Any) -> None:
+        """Push item to array in collection"""
+        with self._lock:
+            current = self.get(collection, key)
+            if not isinstance(current, list):
+                current = []
+            current.append(item)
+            self.set(collection, key, current)
+
+    def pull(self, collection: str, key: str, item: Any) -> bool:
+        """Remove item from array in collection"""
+        with self._lock:
+            current = self.get(collection, key)
+            if not isinstance(current, list) or item not in current:
+                return False
+            current.remove(item)
+            self.set(collection, key, current)
+            return True
+
+    def increment(self, collection: str, key: str, amount: int = 1) -> None:
+        """Increment numeric value in collection"""
+        with self._lock:
+            self.set(collection, key, self.get(collection, key, 0) + amount)
+
+    def all(self, collection: str) -> Dict[str, Any]:
+        """Get all data from collection"""
+        return self.read(collection)
+
+    def clear(self, collection: str) -> None:
+        """Clear entire collection"""
+        with self._lock, self._conn:
+            self._conn.execute(f'DELETE FROM {self._table(collection)}')
+
+    def size(self, collection: str) -> int:
+        """Get number of keys in collection"""
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self._table(collection)}').fetchone()[0]
+
+    def keys(self, collection: str) -> List[str]:
+        """Get all keys in collection"""
+        with self._lock:
+            rows = self._conn.execute(f'SELECT key FROM {self._table(collection)}').fetchall()
+        return [row[0] for row in rows]
+
+    def iter_items(self, collection: str, prefix: Optional[str] = None,
+                   batch_size: int = 500) -> Iterator[Tuple[str, Any]]:
+        """Stream (key, value) pairs in key order, ``batch_size`` rows per query
+
+        Pages by the last key seen (keyset pagination), so the shared connection
+        is only locked for one query at a time. A prefix becomes a key range
+        and uses the primary key index.
+        """
+        with self._lock:
+            table = self._table(collection)
+        last_key = None
+        while True:
+            conditions, params = [], []
+            if prefix:
+                conditions.append('key >= ? AND key < ?')
+                params += [prefix, prefix + '\U0010ffff']
+            if last_key is not None:
+                conditions.append('key > ?')
+                params.append(last_key)
+            where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT key, value FROM {table} {where}ORDER BY key LIMIT ?', (*params, batch_size)
+                ).fetchall()
+            for key, value in rows:
+                yield key, self._decode(value)
+            if len(rows) < batch_size:
+                return
+            last_key = rows[-1][0]
+
+    def import_json(self) -> Dict[str, int]:
+        """Import data/* collection files (and their journals) that don't have a table yet
+
+        Returns the number of records imported per collection. Collections that
+        already exist in SQLite are skipped, so this is safe to run on every start.
+        """
+        files: Dict[str, Set[str]] = {}
+        for path in self.db_dir.iterdir():
+            # Journals count too: a write-back collection may never have been flushed
+            for suffix in self._FILE_SUFFIXES:
+                if path.name.endswith(suffix):
+                    name = path.name[:-len(suffix)]
+                    match = self._FILE_NAME.match(name)
+                    if match and self._COLLECTION_NAME.match(match['collection']):
+                        files.setdefault(match['collection'], set()).add(name)
+                    break
+        imported = {}
+        for collection, names in sorted(files.items()):
+            if self._has_table(collection):
+                continue
+            data = {}
+            for name in sorted(names):
+                chunk = self._load(name)
+                self._replay_journal(name, chunk)
+                data.update(chunk)
+            self.write(collection, data)
+            imported[collection] = len(data)
+        return imported
 
 
 class GuildSettings:
@@ -130,9 +969,32 @@ class GuildSettings:
 
     def set_setting(self, guild_id: int, key: str, value: Any) -> None:
         """Set a specific setting for a guild"""
-        settings = self.get_settings(guild_id)
-        settings[key] = value
-        self.db.set(self.collection, str(guild_id), settings)
+        with self.db.lock(self.collection):
+            settings = self.get_settings(guild_id)
+            settings[key] = value
+            self.db.set(self.collection, str(guild_id), settings)
+
+    def update_settings(self, guild_id: int, values: Dict[str, Any]) -> None:
+        """Set several settings for a guild in one write"""
+        with self.db.lock(self.collection):
+            settings = self.get_settings(guild_id)
+            settings.update(values)
+            self.db.set(self.collection, str(guild_id), settings)
+
+    def claim_daily(self, guild_id: int, day: str, next_due: str) -> bool:
+        """Atomically mark the daily animal for ``day`` as sent
+
+        Returns False if it was already claimed, so concurrent or repeated
+        deliveries send at most one message per guild per day.
+        """
+        with self.db.lock(self.collection):
+            settings = self.get_settings(guild_id)
+            if not settings or settings.get('last_daily_animal') == day:
+                return False
+            settings['last_daily_animal'] = day
+            settings['daily_next_due'] = next_due
+            self.db.set(self.collection, str(guild_id), settings)
+            return True
 
     def get_setting(self, guild_id: int, key: str, default: Any = None) -> Any:
         """Get a specific setting for a guild"""
@@ -141,54 +1003,180 @@ class GuildSettings:
 
     def delete_setting(self, guild_id: int, key: str) -> None:
         """Delete a specific setting for a guild"""
-        settings = self.get_settings(guild_id)
-        if key in settings:
-            del settings[key]
-            self.db.set(self.collection, str(guild_id), settings)
+        with self.db.lock(self.collection):
+            settings = self.get_settings(guild_id)
+            if key in settings:
+                del settings[key]
+                self.db.set(self.collection, str(guild_id), settings)
 
     def initialize_guild(self, guild_id: int, config: Dict = None) -> None:
         """Initialize default settings for a guild"""
-        if not self.db.exists(self.collection, str(guild_id)):
-            default_settings = {
-                'daily_animal_enabled': False,
-                'daily_animal_channel': None,
-                'daily_animal_time': config.get('default_daily_time', '08:00') if config else '08:00',
-                'daily_animal_hour': 8,
-                'daily_animal_minute': 0,
-                'last_daily_animal': None,
-                'animal_types': config.get('default_animals', []) if config else [],
-                'prefix': config.get('prefix', '!') if config else '!',
-                'created_at': datetime.now().isoformat()
-            }
-            self.db.set(self.collection, str(guild_id), default_settings)
+        with self.db.lock(self.collection):
+            if not self.db.exists(self.collection, str(guild_id)):
+                default_settings = {
+                    'daily_animal_enabled': False,
+                    'daily_animal_channel': None,
+                    'daily_animal_time': config.get('default_daily_time', '08:00') if config else '08:00',
+                    'daily_animal_hour': 8,
+                    'daily_animal_minute': 0,
+                    'last_daily_animal': None,
+                    'animal_types': config.get('default_animals', []) if config else [],
+                    'prefix': config.get('prefix', '!') if config else '!',
+                    'created_at': datetime.now().isoformat()
+                }
+                self.db.set(self.collection, str(guild_id), default_settings)
+
+    # Async variants run the whole read-modify-write on the database worker thread
+    async def aget_settings(self, guild_id: int) -> Dict[str, Any]:
+        return await self.db.run(self.get_settings, guild_id)
+
+    async def aset_setting(self, guild_id: int, key: str, value: Any) -> None:
+        await self.db.run(self.set_setting, guild_id, key, value)
+
+    async def aupdate_settings(self, guild_id: int, values: Dict[str, Any]) -> None:
+        await self.db.run(self.update_settings, guild_id, values)
+
+    async def aclaim_daily(self, guild_id: int, day: str, next_due: str) -> bool:
+        return await self.db.run(self.claim_daily, guild_id, day, next_due)
+
+    async def aget_setting(self, guild_id: int, key: str, default: Any = None) -> Any:
+        return await self.db.run(self.get_setting, guild_id, key, default)
+
+    async def adelete_setting(self, guild_id: int, key: str) -> None:
+        await self.db.run(self.delete_setting, guild_id, key)
+
+    async def ainitialize_guild(self, guild_id: int, config: Dict = None) -> None:
+        await self.db.run(self.initialize_guild, guild_id, config)
 
 
 class UserStats:
-    """User statistics manager"""
+    """User statistics manager
 
-    def __init__(self, db: JSONDatabase):
+    Counter bumps are coalesced in memory per (user, field) and applied in one
+    batched write every ``batch_window`` seconds or once ``batch_max_events``
+    are pending; reads merge in the deltas that have not been written yet.
+
+    With an ``event_log`` every bump is also appended to the log, which makes
+    the pending deltas durable, so they are folded in every
+    ``compact_interval`` seconds instead and the log segment is archived.
+    """
+
+    def __init__(self, db: JSONDatabase, event_log: Optional[StatsEventLog] = None,
+                 compact_interval: float = 60.0, batch_window: float = 0.5, batch_max_events: int = 200):
         self.db = db
         self.collection = 'user_stats'
+        self.event_log = event_log
+        self.flush_interval = compact_interval if event_log is not None else batch_window
+        self.aggregator = CounterAggregator(max_events=batch_max_events)
+        self._pending_lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._wake = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        if event_log is not None:
+            self._recover()
+        if self.flush_interval > 0:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name='UserStats-flush', daemon=True
+            )
+            self._flush_thread.start()
+
+    # Key in user_stats naming the event log segments already folded in but maybe not archived yet
+    COMPACTED_KEY = '_compacted_segments'
+
+    def _apply(self, deltas: CounterDeltas, segment: Optional[Path] = None) -> None:
+        """Write aggregated deltas into the collection in one batch
+
+        ``segment`` is the event log segment the deltas came from. Its name is
+        saved in the same batch, so if the bot dies before the segment is
+        archived, the next start archives it without counting it twice.
+        """
+        if not deltas and segment is None:
+            return
+        with self.db.lock(self.collection):
+            stored = self.db.get_many(self.collection, list(deltas) + [self.COMPACTED_KEY])
+            values = {
+                user_id: CounterAggregator.merge(stored.get(user_id, {}), user_deltas)
+                for user_id, user_deltas in deltas.items()
+            }
+            if segment is not None:
+                pending = {path.name for path in self.event_log.pending_segments()}
+                compacted = [name for name in stored.get(self.COMPACTED_KEY, []) if name in pending]
+                values[self.COMPACTED_KEY] = compacted + [segment.name]
+            self.db.set_many(self.collection, values)
+
+    def _record(self, user_id: int, field: str, name: str) -> None:
+        """Count an event until the next batched write"""
+        with self._pending_lock:
+            if self.event_log is not None:
+                self.event_log.append(user_id, field, name)
+            full = self.aggregator.add(str(user_id), field, name)
+        if full:
+            if self._flush_thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def _recover(self) -> None:
+        """Fold event log segments left behind by a previous run"""
+        self.event_log.rotate()
+        compacted = set(self.db.get(self.collection, self.COMPACTED_KEY, []))
+        for segment in self.event_log.pending_segments():
+            if segment.name not in compacted:
+                replay = CounterAggregator()
+                for _, user_id, field, name in self.event_log.read_segment(segment):
+                    replay.add(user_id, field, name)
+                self._apply(replay.drain(), segment)
+            self.event_log.archive(segment)
+
+    def flush(self) -> None:
+        """Apply pending deltas (and archive the event log segment they came from)"""
+        with self._flush_lock:
+            with self._pending_lock:
+                segment = self.event_log.rotate() if self.event_log is not None else None
+                self._apply(self.aggregator.drain(), segment)
+            if segment is not None:
+                try:
+                    self.event_log.archive(segment)
+                except OSError as e:
+                    print(f"Error archiving stats segment {segment.name}: {e}")
+
+    def _flush_loop(self) -> None:
+        """Background thread applying pending deltas periodically"""
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing user stats: {e}")
+
+    def close(self) -> None:
+        """Stop the flush thread and apply any remaining deltas"""
+        self._stopping = True
+        self._wake.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=self.flush_interval + 5)
+            self._flush_thread = None
+        self.flush()
+        if self.event_log is not None:
+            self.event_log.close()
 
     def get_stats(self, user_id: int) -> Dict[str, Any]:
-        """Get all stats for a user"""
-        return self.db.get(self.collection, str(user_id), {})
+        """Get all stats for a user, including deltas not written yet"""
+        with self._pending_lock:
+            stats = self.db.get(self.collection, str(user_id), {})
+            return CounterAggregator.merge(stats, self.aggregator.pending(str(user_id)))
 
     def increment_command(self, user_id: int, command: str) -> None:
         """Increment command usage count"""
-        stats = self.get_stats(user_id)
-        if 'commands' not in stats:
-            stats['commands'] = {}
-        stats['commands'][command] = stats['commands'].get(command, 0) + 1
-        self.db.set(self.collection, str(user_id), stats)
+        self._record(user_id, 'commands', command)
 
     def add_favorite_animal(self, user_id: int, animal: str) -> None:
         """Add favorite animal"""
-        stats = self.get_stats(user_id)
-        if 'favorite_animals' not in stats:
-            stats['favorite_animals'] = {}
-        stats['favorite_animals'][animal] = stats['favorite_animals'].get(animal, 0) + 1
-        self.db.set(self.collection, str(user_id), stats)
+        self._record(user_id, 'favorite_animals', animal)
 
     def get_favorite_animal(self, user_id: int) -> Optional[str]:
         """Get most viewed animal"""
@@ -202,3 +1190,19 @@ class UserStats:
         """Get total commands used by user"""
         stats = self.get_stats(user_id)
         return sum(stats.get('commands', {}).values())
+
+    # Async variants run on the database worker thread
+    async def aget_stats(self, user_id: int) -> Dict[str, Any]:
+        return await self.db.run(self.get_stats, user_id)
+
+    async def aincrement_command(self, user_id: int, command: str) -> None:
+        await self.db.run(self.increment_command, user_id, command)
+
+    async def aadd_favorite_animal(self, user_id: int, animal: str) -> None:
+        await self.db.run(self.add_favorite_animal, user_id, animal)
+
+    async def aget_favorite_animal(self, user_id: int) -> Optional[str]:
+        return await self.db.run(self.get_favorite_animal, user_id)
+
+    async def aget_total_commands(self, user_id: int) -> int:
+        return await self.db.run(self.get_total_commands, user_id)
@@ -0,0 +1,47 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+# Which parser loads() uses, for logging
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(raw: bytes) -> Any:
+    """Decode a JSON response body straight from bytes, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def search_urls(raw: bytes) -> List[str]:
+    """Image URLs from a TheCatAPI / TheDogAPI search response"""
+    data = loads(raw)
+    if not isinstance(data, list):
+        return []
+    return [item['url'] for item in data if isinstance(item, dict) and item.get('url')]
+
+
+def field(raw: bytes, key: str) -> Optional[str]:
+    """One string field of a JSON object response (e.g. RandomFox's 'image')"""
+    data = loads(raw)
+    value = data.get(key) if isinstance(data, dict) else None
+    return value if isinstance(value, str) and value else None
+
+
+def wikimedia_page(raw: bytes, extensions: Tuple[str, ...]) -> Tuple[List[str], Optional[str]]:
+    """(image URLs ending in one of ``extensions``, aicontinue token) from an allimages page"""
+    data = loads(raw)
+    if not isinstance(data, dict):
+        return [], None
+    token = (data.get('continue') or {}).get('aicontinue')
+    images = (data.get('query') or {}).get('allimages') or []
+    urls = []
+    for image in images:
+        url = image.get('url')
+        if url and url.lower().endswith(extensions):
+            urls.append(url)
+    return urls, token
@@ -0,0 +1,155 @@
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _Ring:
+    """Fixed-size ring of (url, fetched_at), oldest entry overwritten when full"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: List[Tuple[str, float]] = []
+        self.urls: Set[str] = set()
+        self.next = 0  # Slot the next add overwrites once the ring is full
+
+    def ordered(self) -> List[Tuple[str, float]]:
+        """Entries oldest first"""
+        return self.entries[self.next:] + self.entries[:self.next]
+
+    def add(self, url: str, now: float) -> bool:
+        if url in self.urls:
+            return False
+        if len(self.entries) < self.max_size:
+            self.entries.append((url, now))
+        else:
+            self.urls.discard(self.entries[self.next][0])
+            self.entries[self.next] = (url, now)
+            self.next = (self.next + 1) % self.max_size
+        self.urls.add(url)
+        return True
+
+    def purge(self, cutoff: float) -> None:
+        """Drop entries fetched before ``cutoff``, keeping the rest oldest first"""
+        self.entries = [(url, fetched) for url, fetched in self.ordered() if fetched >= cutoff]
+        self.urls = {url for url, _ in self.entries}
+        self.next = 0
+
+
+class ImagePool:
+    """Bounded per-animal pools of recently fetched image URLs
+
+    Each animal keeps up to ``max_size`` distinct URLs; adding to a full pool
+    overwrites the oldest one. URLs older than ``ttl`` seconds are never
+    served and are dropped lazily. ``get()`` returns a random URL in O(1).
+    """
+
+    def __init__(self, max_size: int = 50, ttl: float = 3600.0):
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self._rings: Dict[str, _Ring] = {}
+        self.changes = 0  # Bumped whenever URLs are added or dropped, to spot unsaved changes
+
+    def _ring(self, animal: str) -> _Ring:
+        ring = self._rings.get(animal)
+        if ring is None:
+            ring = self._rings[animal] = _Ring(self.max_size)
+        return ring
+
+    def add(self, animal: str, urls: Iterable[str], fetched_at: Optional[float] = None) -> int:
+        """Add fetched URLs to an animal's pool, returns how many were new"""
+        ring = self._ring(animal)
+        now = time.time() if fetched_at is None else fetched_at
+        added = sum(ring.add(url, now) for url in urls if url)
+        self.changes += bool(added)
+        return added
+
+    def get(self, animal: str) -> Optional[str]:
+        """A random unexpired URL for an animal, or None if the pool is empty"""
+        ring = self._rings.get(animal)
+        if not ring or not ring.entries:
+            return None
+        url, fetched = random.choice(ring.entries)
+        cutoff = time.time() - self.ttl
+        if fetched >= cutoff:
+            return url
+        ring.purge(cutoff)
+        return random.choice(ring.entries)[0] if ring.entries else None
+
+    def sample(self, animal: str, count: int) -> List[str]:
+        """Up to ``count`` distinct unexpired URLs for an animal"""
+        ring = self._rings.get(animal)
+        if not ring:
+            return []
+        ring.purge(time.time() - self.ttl)
+        return [url for url, _ in random.sample(ring.entries, min(count, len(ring.entries)))]
+
+    def expire(self, animal: str) -> int:
+        """Drop an animal's expired URLs now, returns how many are left"""
+        ring = self._rings.get(animal)
+        if not ring:
+            return 0
+        ring.purge(time.time() - self.ttl)
+        return len(ring.entries)
+
+    def size(self, animal: str) -> int:
+        """Number of URLs pooled for an animal (expired ones included until purged)"""
+        ring = self._rings.get(animal)
+        return len(ring.entries) if ring else 0
+
+    def resize(self, max_size: int, ttl: Optional[float] = None) -> None:
+        """Change the pool limits, trimming pools that are now too big"""
+        self.max_size = max(1, int(max_size))
+        if ttl is not None:
+            self.ttl = ttl
+        self.changes += 1
+        for animal, ring in list(self._rings.items()):
+            ring.purge(time.time() - self.ttl)
+            resized = self._rings[animal] = _Ring(self.max_size)
+            for url, fetched in ring.entries[-self.max_size:]:
+                resized.add(url, fetched)
+
+    def clear(self, animal: Optional[str] = None) -> None:
+        """Empty one animal's pool, or all of them"""
+        self.changes += 1
+        if animal is None:
+            self._rings.clear()
+        else:
+            self._rings.pop(animal, None)
+
+    def export(self) -> Dict[str, List[Tuple[str, float]]]:
+        """Unexpired (url, fetched_at) per animal, oldest first, for saving"""
+        cutoff = time.time() - self.ttl
+        exported = {}
+        for animal, ring in self._rings.items():
+            entries = [(url, fetched) for url, fetched in ring.ordered() if fetched >= cutoff]
+            if entries:
+                exported[animal] = entries
+        return exported
+
+    def load(self, data: Dict[str, Iterable[Tuple[str, float]]]) -> Tuple[int, int]:
+        """Restore pools saved by ``export()``, skipping expired URLs
+
+        Returns (URLs added, malformed entries skipped).
+        """
+        cutoff = time.time() - self.ttl
+        added = skipped = 0
+        for animal, entries in data.items():
+            if not isinstance(entries, list):
+                skipped += 1
+                continue
+            for entry in entries:
+                try:
+                    url, fetched = entry
+                    fetched = float(fetched)
+                except (TypeError, ValueError):
+                    url = None
+                if not isinstance(url, str):
+                    skipped += 1
+                    continue
+                if fetched >= cutoff:
+                    added += self.add(animal, [url], fetched_at=fetched)
+        return added, skipped
+
+    def stats(self) -> Dict[str, int]:
+        """Pool size per animal, for monitoring"""
+        return {animal: len(ring.entries) for animal, ring in self._rings.items()}
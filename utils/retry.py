@@ -0,0 +1,71 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by a per-call latency budget
+
+    The n-th retry waits a random time between 0 and
+    ``min(max_delay, base_delay * 2 ** n)`` seconds. No call may spend more
+    than ``budget`` seconds in total, waits included, so a slow upstream
+    gives up early and the caller falls back.
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0, budget: float = 8.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retrying after failed attempt number ``attempt`` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def deadline(self) -> float:
+        """Monotonic time a call started now has to finish by"""
+        return time.monotonic() + self.budget
+
+
+class RateLimits:
+    """Per-host rate limit state learned from 429 responses and Retry-After"""
+
+    # Longest Retry-After honoured, so one bad header can't park a host for hours
+    MAX_WAIT = 300.0
+
+    def __init__(self, default_wait: float = 5.0):
+        self.default_wait = default_wait
+        self._until: Dict[str, float] = {}
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def limit(self, host: str, retry_after: Optional[str]) -> float:
+        """Record a 429 from a host, returns how long it is rate limited for"""
+        wait = self.parse_retry_after(retry_after)
+        wait = min(self.default_wait if wait is None else wait, self.MAX_WAIT)
+        self._until[host] = max(self._until.get(host, 0.0), time.monotonic() + wait)
+        return wait
+
+    def wait_time(self, host: str) -> float:
+        """Seconds until a host may be called again (0 if it isn't rate limited)"""
+        until = self._until.get(host)
+        if until is None:
+            return 0.0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del self._until[host]
+            return 0.0
+        return remaining
@@ -0,0 +1,123 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# (hour, minute) of a daily delivery
+Slot = Tuple[int, int]
+
+
+def next_occurrence(slot: Slot, after: datetime) -> datetime:
+    """First time strictly after ``after`` that falls on ``slot``"""
+    candidate = after.replace(hour=slot[0], minute=slot[1], second=0, microsecond=0)
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class DailySchedule:
+    """In-memory index of guilds with daily animals enabled
+
+    Maps each (hour, minute) to the guilds scheduled at that time, and keeps a
+    queue of every guild's next due timestamp (``daily_next_due`` in its
+    settings). The daily loop pops whatever is due, so deliveries missed
+    because a tick ran late or the bot was down are picked up on the next
+    tick. The index is built from ``guild_settings`` at startup and kept
+    current with ``update()`` whenever a guild's settings change.
+    """
+
+    def __init__(self):
+        self._slots: Dict[Slot, Set[int]] = {}
+        self._guild_slots: Dict[int, Slot] = {}
+        self._next_due: Dict[int, datetime] = {}
+        self._queue: List[Tuple[datetime, int]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of guilds with daily animals scheduled"""
+        return len(self._guild_slots)
+
+    @staticmethod
+    def slot_for(settings: Dict[str, Any]) -> Optional[Slot]:
+        """The slot a guild is due in, or None if it has nothing scheduled"""
+        if not settings.get('daily_animal_enabled') or not settings.get('daily_animal_channel'):
+            return None
+        return int(settings.get('daily_animal_hour', 8)), int(settings.get('daily_animal_minute', 0))
+
+    @classmethod
+    def next_due_for(cls, settings: Dict[str, Any], now: datetime) -> Optional[datetime]:
+        """When a guild's next daily is due, from its stored schedule"""
+        slot = cls.slot_for(settings)
+        if slot is None:
+            return None
+        stored = settings.get('daily_next_due')
+        if stored:
+            try:
+                return datetime.fromisoformat(stored)
+            except (TypeError, ValueError):
+                pass
+        # Nothing stored yet: today's slot, unless today's daily already went out
+        today = now.replace(hour=slot[0], minute=slot[1], second=0, microsecond=0)
+        if settings.get('last_daily_animal') == today.strftime('%Y-%m-%d'):
+            return today + timedelta(days=1)
+        return today
+
+    def update(self, guild_id: int, settings: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> None:
+        """Index (or unindex) a guild from its current settings"""
+        guild_id = int(guild_id)
+        slot = self.slot_for(settings) if isinstance(settings, dict) else None
+        next_due = self.next_due_for(settings, now or datetime.now()) if slot is not None else None
+        with self._lock:
+            previous = self._guild_slots.pop(guild_id, None)
+            self._next_due.pop(guild_id, None)
+            if previous is not None:
+                guilds = self._slots.get(previous)
+                if guilds is not None:
+                    guilds.discard(guild_id)
+                    if not guilds:
+                        del self._slots[previous]
+            if slot is not None:
+                self._guild_slots[guild_id] = slot
+                self._slots.setdefault(slot, set()).add(guild_id)
+                self._next_due[guild_id] = next_due
+                heapq.heappush(self._queue, (next_due, guild_id))
+
+    def remove(self, guild_id: int) -> None:
+        """Drop a guild from the index"""
+        self.update(guild_id, None)
+
+    def clear(self) -> None:
+        """Empty the index before a rebuild"""
+        with self._lock:
+            self._slots.clear()
+            self._guild_slots.clear()
+            self._next_due.clear()
+            self._queue.clear()
+
+    def due(self, hour: int, minute: int) -> Set[int]:
+        """Guilds scheduled at the given minute"""
+        with self._lock:
+            return set(self._slots.get((hour, minute), ()))
+
+    def pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        """Take every (guild_id, due) at or before ``now``, oldest first
+
+        Each returned guild is moved on to its next occurrence, so it is only
+        handed out once per due time whether or not the delivery succeeds.
+        """
+        popped = []
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                due, guild_id = heapq.heappop(self._queue)
+                if self._next_due.get(guild_id) != due:
+                    continue  # Superseded by a later update()
+                popped.append((guild_id, due))
+                next_due = next_occurrence(self._guild_slots[guild_id], now)
+                self._next_due[guild_id] = next_due
+                heapq.heappush(self._queue, (next_due, guild_id))
+        return popped
+
+    def slot(self, guild_id: int) -> Optional[Slot]:
+        """The slot a guild is indexed under"""
+        with self._lock:
+            return self._guild_slots.get(int(guild_id))
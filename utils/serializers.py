@@ -0,0 +1,165 @@
+import io
+import json
+import marshal
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+
+class JSONSerializer:
+    """JSON collections, pretty-printed or compact"""
+
+    magic = b''
+    extension = '.json'
+
+    def __init__(self, name: str, indent: Optional[int] = None):
+        self.name = name
+        self.indent = indent
+        self.separators = None if indent else (',', ':')
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, indent=self.indent, separators=self.separators, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, raw: bytes) -> Dict[str, Any]:
+        return json.loads(raw.decode('utf-8'))
+
+    def iter_items(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+        """Incrementally parse a top-level JSON object, one member at a time
+
+        Only the current chunk plus the member being parsed are held in memory.
+        """
+        reader = io.TextIOWrapper(f, encoding='utf-8')
+        decoder = json.JSONDecoder()
+        text, pos, eof = '', 0, False
+
+        def fill() -> None:
+            nonlocal text, pos, eof
+            more = reader.read(chunk_size)
+            eof = not more
+            text, pos = text[pos:] + more, 0
+
+        def skip_whitespace() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(text) and text[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(text) or eof:
+                    return text[pos] if pos < len(text) else ''
+                fill()
+
+        if skip_whitespace() != '{':
+            raise ValueError("Collection is not a JSON object")
+        pos += 1
+        while True:
+            char = skip_whitespace()
+            if char == '}':
+                return
+            if char == ',':
+                pos += 1
+                continue
+            if not char:
+                raise ValueError("Unexpected end of JSON collection")
+            try:
+                key, end = decoder.raw_decode(text, pos)
+                while end < len(text) and text[end] in ' \t\r\n':
+                    end += 1
+                if end >= len(text) or text[end] != ':':
+                    raise json.JSONDecodeError("Expecting ':'", text, end)
+                end += 1
+                while end < len(text) and text[end] in ' \t\r\n':
+                    end += 1
+                value, end = decoder.raw_decode(text, end)
+                # A number cut by the chunk boundary ("1." of "1.5") still decodes, so only
+                # accept the member once the delimiter that follows it is in the buffer
+                while end < len(text) and text[end] in ' \t\r\n':
+                    end += 1
+                if end >= len(text) or text[end] not in ',}':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", text, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            pos = end
+            yield key, value
+
+
+class MarshalSerializer:
+    """Python marshal format - fastest, but tied to the Python version that wrote it"""
+
+    name = 'marshal'
+    magic = b'AVMARSHAL1\n'
+    extension = '.marshal'
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return self.magic + marshal.dumps(data, 4)
+
+    def loads(self, raw: bytes) -> Dict[str, Any]:
+        try:
+            return marshal.loads(raw[len(self.magic):])
+        except (EOFError, TypeError) as e:
+            raise ValueError(f"Invalid marshal data: {e}") from e
+
+    def iter_items(self, f: BinaryIO) -> Iterator[Tuple[str, Any]]:
+        """marshal can't be parsed incrementally, so this loads the whole file"""
+        yield from self.loads(f.read()).items()
+
+
+class MsgpackSerializer:
+    """MessagePack format (requires the optional ``msgpack`` package)"""
+
+    name = 'msgpack'
+    magic = b'AVMSGPACK1\n'
+    extension = '.msgpack'
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return self.magic + msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Dict[str, Any]:
+        try:
+            return msgpack.unpackb(raw[len(self.magic):], raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack data: {e}") from e
+
+    def iter_items(self, f: BinaryIO) -> Iterator[Tuple[str, Any]]:
+        """Stream map entries with a msgpack Unpacker"""
+        f.seek(len(self.magic))
+        unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+        for _ in range(unpacker.read_map_header()):
+            yield unpacker.unpack(), unpacker.unpack()
+
+
+SERIALIZERS = {
+    'json-pretty': JSONSerializer('json-pretty', indent=4),
+    'json': JSONSerializer('json'),
+    'marshal': MarshalSerializer(),
+}
+if msgpack is not None:
+    SERIALIZERS['msgpack'] = MsgpackSerializer()
+
+# Every file extension a collection may be stored under
+EXTENSIONS = ('.json', '.marshal', '.msgpack')
+
+
+def get_serializer(name: str):
+    """Look up a serializer by name"""
+    if name == 'msgpack' and msgpack is None:
+        raise ValueError("The msgpack format needs the msgpack package: pip install msgpack")
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown database format {name!r}, choose from: {', '.join(SERIALIZERS)}")
+    return SERIALIZERS[name]
+
+
+def detect_serializer(raw: bytes):
+    """Pick the serializer that wrote ``raw`` from its header"""
+    if raw.startswith(MarshalSerializer.magic):
+        return SERIALIZERS['marshal']
+    if raw.startswith(MsgpackSerializer.magic):
+        if msgpack is None:
+            # Not a corrupt file - refuse to treat it as one and overwrite it
+            raise RuntimeError("Found msgpack data but the msgpack package is not installed")
+        return SERIALIZERS['msgpack']
+    return SERIALIZERS['json']
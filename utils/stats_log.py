@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# (timestamp, user_id, field, name) - field is 'commands' or 'favorite_animals'
+StatsEvent = Tuple[float, str, str, str]
+
+
+class StatsEventLog:
+    """Append-only, line-delimited log of user statistic events
+
+    Events are written to ``current.log``. ``rotate()`` seals the current file
+    as a pending segment that a compactor folds into the aggregated counters;
+    folded segments are moved to ``archive/`` so historical usage can still be
+    analyzed later.
+    """
+
+    def __init__(self, db_dir: str = 'data'):
+        self.log_dir = Path(db_dir) / 'stats_events'
+        self.archive_dir = self.log_dir / 'archive'
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.current_path = self.log_dir / 'current.log'
+        self._handle = None
+        self._lock = threading.Lock()
+
+    def append(self, user_id: int, field: str, name: str) -> None:
+        """Record a single event"""
+        line = json.dumps([round(time.time(), 3), str(user_id), field, name], ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.current_path, 'a', encoding='utf-8')
+            self._handle.write(line + '\n')
+            self._handle.flush()
+
+    def rotate(self) -> Optional[Path]:
+        """Seal the current log as a pending segment and start a new one"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            if not self.current_path.exists() or self.current_path.stat().st_size == 0:
+                return None
+            segment = self.log_dir / f"pending-{datetime.now():%Y%m%d-%H%M%S-%f}.log"
+            os.replace(self.current_path, segment)
+            return segment
+
+    def pending_segments(self) -> List[Path]:
+        """Sealed segments that have not been compacted yet, oldest first"""
+        return sorted(self.log_dir.glob('pending-*.log'))
+
+    @staticmethod
+    def read_segment(path: Path) -> Iterator[StatsEvent]:
+        """Iterate the events stored in a segment"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    timestamp, user_id, field, name = json.loads(line)
+                except (ValueError, TypeError):
+                    continue  # Torn line from a crash mid-append
+                yield timestamp, user_id, field, name
+
+    def archive(self, segment: Path) -> None:
+        """Move a compacted segment to the archive"""
+        os.replace(segment, self.archive_dir / segment.name.replace('pending-', 'events-', 1))
+
+    def close(self) -> None:
+        """Close the open log file"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None